@@ -1,3 +1,16 @@
+from artist_resolver.cache import (
+    BloomFilter,
+    PersistentResponseCache,
+    ResponseCache,
+    TagCache,
+)
+from artist_resolver.limiter import AdaptiveLimiter
+from artist_resolver.sync import (
+    SyncOperation,
+    SyncPlan,
+    WriteBehindQueue,
+    WriteQueueError,
+)
 from artist_resolver.trackmanager import (
     Alias,
     MbArtistDetails,
@@ -7,9 +20,18 @@ from artist_resolver.trackmanager import (
 )
 
 __all__ = [
+    "AdaptiveLimiter",
     "Alias",
+    "BloomFilter",
     "MbArtistDetails",
+    "PersistentResponseCache",
+    "ResponseCache",
     "SimpleArtistDetails",
+    "SyncOperation",
+    "SyncPlan",
+    "TagCache",
     "TrackDetails",
     "TrackManager",
+    "WriteBehindQueue",
+    "WriteQueueError",
 ]
@@ -0,0 +1,503 @@
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+import httpx
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional
+
+
+class ResponseCache:
+    """
+    In-memory cache for api responses with a size bound, a time to live per entry
+    and least recently used eviction
+    """
+
+    def __init__(
+        self,
+        max_size: int = 4096,
+        ttl: float = 300,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1.")
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: OrderedDict[str, tuple[float, object]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[object]:
+        """
+        Returns the cached value for a key, or None if it is missing or expired
+        """
+
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at <= self.clock():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: object, ttl: float = None) -> None:
+        """
+        Stores a value, evicting the least recently used entries if the cache is full
+        """
+
+        ttl = ttl if ttl is not None else self.ttl
+        self._entries[key] = (self.clock() + ttl, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate_url(self, key: str) -> None:
+        """
+        Removes the entry for a single key
+        """
+
+        self._entries.pop(key, None)
+
+    def invalidate(self, prefix: str) -> None:
+        """
+        Removes all entries with a key starting with prefix
+        """
+
+        for key in [key for key in self._entries if key.startswith(prefix)]:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        """
+        Removes all entries from the cache
+        """
+
+        self._entries.clear()
+
+
+class PersistentResponseCache:
+    """
+    SQLite backed cache for api responses that survives application restarts.
+    Entries younger than fresh_for are served without contacting the api, older entries
+    are revalidated with their ETag and entries older than max_age are discarded.
+    Negative entries, for items that don't exist in the db, are served until they are
+    older than negative_max_age and discarded afterwards.
+    The cache can be used from multiple threads. Stored entries are committed in batches
+    of batch_size, remaining entries are committed by commit or close.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fresh_for: float = 3600,
+        max_age: float = 7 * 24 * 3600,
+        negative_max_age: float = 3600,
+        batch_size: int = 256,
+        clock: Callable[[], float] = time.time,
+    ):
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1.")
+
+        self.path = path
+        self.fresh_for = fresh_for
+        self.max_age = max_age
+        self.negative_max_age = negative_max_age
+        self.batch_size = batch_size
+        self.clock = clock
+        self._pending_writes = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                content BLOB NOT NULL,
+                content_type TEXT,
+                etag TEXT,
+                stored_at REAL NOT NULL,
+                status INTEGER NOT NULL DEFAULT 200,
+                negative INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS metadata (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+            """
+        )
+
+        # databases created before negative entries were stored lack their columns
+        columns = {
+            row[1] for row in self._connection.execute("PRAGMA table_info(responses)")
+        }
+        for column in (
+            "status INTEGER NOT NULL DEFAULT 200",
+            "negative INTEGER NOT NULL DEFAULT 0",
+        ):
+            if column.split()[0] not in columns:
+                self._connection.execute(f"ALTER TABLE responses ADD COLUMN {column}")
+
+        self._connection.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM responses"
+            ).fetchone()[0]
+
+    def get(self, url: str) -> Optional[dict]:
+        """
+        Returns the cached entry for an url, or None if it is missing or expired.
+        The fresh key of the entry indicates if it can be used without revalidation.
+        """
+
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT content, content_type, etag, stored_at, status, negative FROM responses WHERE url = ?",
+                (url,),
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            content, content_type, etag, stored_at, status, negative = row
+            age = self.clock() - stored_at
+
+            if age > (self.negative_max_age if negative else self.max_age):
+                self._connection.execute("DELETE FROM responses WHERE url = ?", (url,))
+                self._write()
+                return None
+
+        return {
+            "content": content,
+            "content_type": content_type,
+            "etag": etag,
+            "stored_at": stored_at,
+            "status": status,
+            "negative": bool(negative),
+            "fresh": bool(negative) or age <= self.fresh_for,
+        }
+
+    def set(self, url: str, response: httpx.Response, negative: bool = False) -> None:
+        """
+        Stores the body of a response. negative marks responses for items that don't exist in the db.
+        The entry is committed once batch_size entries are pending.
+        """
+
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (url, content, content_type, etag, stored_at, status, negative) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    url,
+                    response.content,
+                    response.headers.get("content-type"),
+                    response.headers.get("etag"),
+                    self.clock(),
+                    response.status_code,
+                    negative,
+                ),
+            )
+            self._write()
+
+    def touch(self, url: str) -> None:
+        """
+        Marks an entry as fresh again after it was successfully revalidated.
+        The change is committed once batch_size entries are pending.
+        """
+
+        with self._lock:
+            self._connection.execute(
+                "UPDATE responses SET stored_at = ? WHERE url = ?", (self.clock(), url)
+            )
+            self._write()
+
+    def commit(self) -> None:
+        """
+        Commits all pending entries
+        """
+
+        with self._lock:
+            self._commit()
+
+    def _write(self) -> None:
+        self._pending_writes += 1
+        if self._pending_writes >= self.batch_size:
+            self._commit()
+
+    def _commit(self) -> None:
+        self._connection.commit()
+        self._pending_writes = 0
+
+    def invalidate_url(self, url: str) -> None:
+        """
+        Removes the entry for a single url
+        """
+
+        with self._lock:
+            self._connection.execute("DELETE FROM responses WHERE url = ?", (url,))
+            self._commit()
+
+    def invalidate(self, prefix: str) -> None:
+        """
+        Removes all entries with an url starting with prefix
+        """
+
+        with self._lock:
+            self._connection.execute(
+                "DELETE FROM responses WHERE substr(url, 1, ?) = ?",
+                (len(prefix), prefix),
+            )
+            self._commit()
+
+    def clear(self) -> None:
+        """
+        Removes all entries from the cache
+        """
+
+        with self._lock:
+            self._connection.execute("DELETE FROM responses")
+            self._commit()
+
+    def get_metadata(self, key: str) -> Optional[str]:
+        """
+        Returns a stored metadata value, or None if it is missing
+        """
+
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value FROM metadata WHERE key = ?", (key,)
+            ).fetchone()
+
+        return row[0] if row else None
+
+    def set_metadata(self, key: str, value: str) -> None:
+        """
+        Stores a metadata value, e.g. a sync cursor, next to the cached responses
+        """
+
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO metadata (key, value) VALUES (?, ?)",
+                (key, value),
+            )
+            self._commit()
+
+    def close(self) -> None:
+        """
+        Commits pending entries and closes the underlying database
+        """
+
+        with self._lock:
+            self._commit()
+            self._connection.close()
+
+    @staticmethod
+    def to_response(url: str, entry: dict) -> httpx.Response:
+        """
+        Creates a response object from a cached entry
+        """
+
+        headers = {}
+        if entry["content_type"]:
+            headers["content-type"] = entry["content_type"]
+        if entry["etag"]:
+            headers["etag"] = entry["etag"]
+
+        return httpx.Response(
+            entry["status"],
+            content=entry["content"],
+            headers=headers,
+            request=httpx.Request("GET", url),
+        )
+
+
+class TagCache:
+    """
+    SQLite backed cache for tag values read from audio files. Entries are keyed by the
+    normalized file path and are only used while the size, modification time and inode
+    of the file are unchanged, so that unchanged files can be loaded without opening them.
+    The cache can be used from multiple threads. Stored entries are committed in batches
+    of batch_size, remaining entries are committed by commit or close.
+    """
+
+    def __init__(self, path: str, batch_size: int = 256):
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1.")
+
+        self.path = path
+        self.batch_size = batch_size
+        self._pending_writes = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS tags (
+                file_path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                tag_values TEXT NOT NULL
+            )
+            """
+        )
+        self._connection.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM tags").fetchone()[0]
+
+    def get(self, file_path: str, stat: os.stat_result) -> Optional[dict]:
+        """
+        Returns the cached tag values of a file, or None if they are missing
+        or the file changed since they were stored
+        """
+
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT size, mtime_ns, inode, tag_values FROM tags WHERE file_path = ?",
+                (os.path.normpath(file_path),),
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        size, mtime_ns, inode, tag_values = row
+        if (size, mtime_ns, inode) != (stat.st_size, stat.st_mtime_ns, stat.st_ino):
+            return None
+
+        return json.loads(tag_values)
+
+    def set(self, file_path: str, stat: os.stat_result, tag_values: dict) -> None:
+        """
+        Stores the tag values of a file together with its current file attributes.
+        The entry is committed once batch_size entries are pending.
+        """
+
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO tags (file_path, size, mtime_ns, inode, tag_values) VALUES (?, ?, ?, ?, ?)",
+                (
+                    os.path.normpath(file_path),
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                    stat.st_ino,
+                    json.dumps(tag_values),
+                ),
+            )
+            self._pending_writes += 1
+
+            if self._pending_writes >= self.batch_size:
+                self._commit()
+
+    def commit(self) -> None:
+        """
+        Commits all pending entries
+        """
+
+        with self._lock:
+            self._commit()
+
+    def _commit(self) -> None:
+        self._connection.commit()
+        self._pending_writes = 0
+
+    def invalidate(self, file_path: str) -> None:
+        """
+        Removes the entry of a file
+        """
+
+        with self._lock:
+            self._connection.execute(
+                "DELETE FROM tags WHERE file_path = ?", (os.path.normpath(file_path),)
+            )
+            self._commit()
+
+    def clear(self) -> None:
+        """
+        Removes all entries from the cache
+        """
+
+        with self._lock:
+            self._connection.execute("DELETE FROM tags")
+            self._commit()
+
+    def close(self) -> None:
+        """
+        Commits pending entries and closes the underlying database
+        """
+
+        with self._lock:
+            self._commit()
+            self._connection.close()
+
+
+class BloomFilter:
+    """
+    Compact set summary that can answer if an item is definitely not part of the set.
+    Membership checks can return false positives at roughly error_rate, but never false negatives.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1.")
+
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1.")
+
+        self.size = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[position // 8] & (1 << (position % 8))
+            for position in self._positions(item)
+        )
+
+    def _positions(self, item: str) -> Iterable[int]:
+        """
+        Returns the bit positions of an item using double hashing
+        """
+
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first_hash = int.from_bytes(digest[:8], "little")
+        second_hash = int.from_bytes(digest[8:], "little") | 1
+        return (
+            (first_hash + i * second_hash) % self.size for i in range(self.hash_count)
+        )
+
+    def add(self, item: str) -> None:
+        """
+        Adds an item to the filter
+        """
+
+        for position in self._positions(item):
+            self._bits[position // 8] |= 1 << (position % 8)
+
+    @classmethod
+    def from_items(cls, items: Iterable[str], error_rate: float = 0.01):
+        """
+        Creates a filter containing all provided items
+        """
+
+        items = list(items)
+        bloom_filter = cls(max(1, len(items)), error_rate)
+        for item in items:
+            bloom_filter.add(item)
+
+        return bloom_filter
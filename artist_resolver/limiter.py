@@ -0,0 +1,173 @@
+import asyncio
+import contextlib
+import time
+import httpx
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+
+class AdaptiveLimiter:
+    """
+    Limits the number of parallel api requests and adapts the limit to the observed
+    behavior of the api. The limit grows additively while latency stays close to the
+    lowest recently observed latency, and is cut multiplicatively if latency rises, the api
+    responds with 429 or 5xx, or a request times out.
+    The lowest latency is taken over windows of min_latency_window requests, so that
+    a single fast outlier only counts as the baseline until the next window ends.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        backoff_ratio: float = 0.5,
+        latency_tolerance: float = 2,
+        smoothing: float = 0.2,
+        min_latency_window: int = 100,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError(
+                "Limits must satisfy 1 <= min_limit <= initial_limit <= max_limit."
+            )
+
+        if not 0 < backoff_ratio < 1:
+            raise ValueError("backoff_ratio must be between 0 and 1.")
+
+        if min_latency_window < 1:
+            raise ValueError("min_latency_window must be at least 1.")
+
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.latency_tolerance = latency_tolerance
+        self.smoothing = smoothing
+        self.min_latency_window = min_latency_window
+        self.clock = clock
+
+        self.limit: float = initial_limit
+        self.in_flight = 0
+        self.min_latency: Optional[float] = None
+        self.smoothed_latency: Optional[float] = None
+        self.last_latency: Optional[float] = None
+        self._last_backoff: Optional[float] = None
+        self._window_min_latency: Optional[float] = None
+        self._window_samples = 0
+        self._released = asyncio.Event()
+
+    @property
+    def stats(self) -> dict:
+        """
+        Returns the current limit and observed latencies
+        """
+
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "min_latency": self.min_latency,
+            "smoothed_latency": self.smoothed_latency,
+            "last_latency": self.last_latency,
+        }
+
+    async def acquire(self) -> None:
+        """
+        Waits until a request can be sent without exceeding the current limit
+        """
+
+        while self.in_flight >= int(self.limit):
+            self._released.clear()
+            await self._released.wait()
+
+        self.in_flight += 1
+
+    def release(self, latency: Optional[float], overloaded: bool) -> None:
+        """
+        Frees the slot of a finished request and adapts the limit to its outcome.
+        Latency is None for requests that failed without a meaningful duration.
+        """
+
+        self.in_flight -= 1
+
+        if overloaded:
+            self._backoff()
+        elif latency is not None:
+            self._record_latency(latency)
+
+        self._released.set()
+
+    def _record_latency(self, latency: float) -> None:
+        self.last_latency = latency
+
+        if self.min_latency is None or latency < self.min_latency:
+            self.min_latency = latency
+
+        if self._window_min_latency is None or latency < self._window_min_latency:
+            self._window_min_latency = latency
+
+        self._window_samples += 1
+        if self._window_samples >= self.min_latency_window:
+            # the next window starts from the lowest latency of this window only
+            self.min_latency = self._window_min_latency
+            self._window_min_latency = None
+            self._window_samples = 0
+
+        if self.smoothed_latency is None:
+            self.smoothed_latency = latency
+        else:
+            self.smoothed_latency += self.smoothing * (latency - self.smoothed_latency)
+
+        if self.smoothed_latency > self.min_latency * self.latency_tolerance:
+            self._backoff()
+        else:
+            # grows the limit by roughly one per round of requests
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def _backoff(self) -> None:
+        # back off at most once per round trip so that a burst of failures
+        # from the same round only counts once
+        now = self.clock()
+        if (
+            self._last_backoff is not None
+            and self.smoothed_latency is not None
+            and now - self._last_backoff < self.smoothed_latency
+        ):
+            return
+
+        self._last_backoff = now
+        self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+
+    async def run(
+        self, send: Callable[[], Awaitable[httpx.Response]]
+    ) -> httpx.Response:
+        """
+        Sends a request within the limit and records its outcome
+        """
+
+        async with self.stream(send) as response:
+            return response
+
+    @contextlib.asynccontextmanager
+    async def stream(
+        self, send: Callable[[], Awaitable[httpx.Response]]
+    ) -> AsyncIterator[httpx.Response]:
+        """
+        Sends a request within the limit and holds its slot until the response was consumed.
+        The latency is measured until the response headers arrived, so that the time spent
+        reading a streamed body doesn't count as api latency.
+        """
+
+        await self.acquire()
+        start = self.clock()
+        latency = None
+        overloaded = False
+
+        try:
+            response = await send()
+            latency = self.clock() - start
+            overloaded = response.status_code == 429 or response.status_code >= 500
+            yield response
+        except httpx.TimeoutException:
+            overloaded = True
+            raise
+        finally:
+            self.release(latency, overloaded)
@@ -0,0 +1,208 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable, Optional
+
+
+class SyncOperation:
+    """
+    Single change that needs to be sent to the db
+    """
+
+    CREATE_MBARTIST = "create_mbartist"
+    UPDATE_MBARTIST = "update_mbartist"
+    CREATE_SIMPLE_ARTIST = "create_simple_artist"
+    UPDATE_SIMPLE_ARTIST = "update_simple_artist"
+    DELETE_ALIAS = "delete_alias"
+    CREATE_ALIAS = "create_alias"
+
+    ARTIST_ACTIONS = (
+        CREATE_MBARTIST,
+        UPDATE_MBARTIST,
+        CREATE_SIMPLE_ARTIST,
+        UPDATE_SIMPLE_ARTIST,
+    )
+
+    def __init__(self, action: str, artist, target_id: Optional[int] = None):
+        self.action = action
+        self.artist = artist
+        self.target_id = target_id
+
+    def __str__(self):
+        return f"{self.action}: {self.artist}"
+
+    def __repr__(self):
+        return f"{self.action}: {self.artist} ({self.target_id})"
+
+
+class SyncPlan:
+    """
+    List of changes needed to bring the db in line with the local artist data
+    """
+
+    def __init__(self):
+        self.operations: list[SyncOperation] = []
+        self.artists: list = []
+        self.resolved_ids: dict[str, int] = {}
+        self.errors: dict[str, Exception] = {}
+
+    def __len__(self) -> int:
+        return len(self.operations)
+
+    def __iter__(self):
+        return iter(self.operations)
+
+    def add(self, action: str, artist, target_id: Optional[int] = None) -> None:
+        """
+        Adds an operation to the plan
+        """
+
+        self.operations.append(SyncOperation(action, artist, target_id))
+
+    def get_operations(self, *actions: str) -> list[SyncOperation]:
+        """
+        Returns all operations of the provided actions
+        """
+
+        return [op for op in self.operations if op.action in actions]
+
+    @property
+    def creates(self) -> list[SyncOperation]:
+        return self.get_operations(
+            SyncOperation.CREATE_MBARTIST, SyncOperation.CREATE_SIMPLE_ARTIST
+        )
+
+    @property
+    def updates(self) -> list[SyncOperation]:
+        return self.get_operations(
+            SyncOperation.UPDATE_MBARTIST, SyncOperation.UPDATE_SIMPLE_ARTIST
+        )
+
+    @property
+    def alias_deletes(self) -> list[SyncOperation]:
+        return self.get_operations(SyncOperation.DELETE_ALIAS)
+
+    @property
+    def alias_creates(self) -> list[SyncOperation]:
+        return self.get_operations(SyncOperation.CREATE_ALIAS)
+
+
+class WriteBehindQueue:
+    """
+    Collects mutations and sends them to the db later. Repeated mutations of the same item
+    are merged, so that only the last one is sent. Pending mutations are flushed once
+    max_pending items are queued, max_delay seconds after the first item was queued,
+    or when flush is called.
+    """
+
+    def __init__(
+        self, max_pending: int = 100, max_delay: float = 5, max_concurrency: int = 8
+    ):
+        self.max_pending = max_pending
+        self.max_delay = max_delay
+        self.max_concurrency = max_concurrency
+        self.errors: dict[Hashable, Exception] = {}
+        self._pending: dict[Hashable, Callable[[], Awaitable]] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flush_lock = asyncio.Lock()
+        self._background_flushes: set[asyncio.Task] = set()
+        self._background_flush_waiting = False
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def enqueue(self, key: Hashable, action: Callable[[], Awaitable]) -> None:
+        """
+        Queues a mutation, replacing any pending mutation with the same key
+        """
+
+        self._pending.pop(key, None)
+        self._pending[key] = action
+
+        if len(self._pending) >= self.max_pending:
+            self._start_background_flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.max_delay, self._start_background_flush
+            )
+
+    def _start_background_flush(self) -> None:
+        """
+        Starts flushing the queue without waiting for the result.
+        Failures of background flushes are collected in the errors property
+        and reported by the next call to flush.
+        Only one background flush waits to take the pending mutations at a time.
+        """
+
+        self._cancel_timer()
+        if self._background_flush_waiting:
+            return
+
+        self._background_flush_waiting = True
+        task = asyncio.ensure_future(self._background_flush())
+        self._background_flushes.add(task)
+        task.add_done_callback(self._background_flushes.discard)
+
+    async def _background_flush(self) -> None:
+        report = await self._send_pending()
+        self.errors.update(
+            {key: error for key, error in report.items() if error is not None}
+        )
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    async def flush(self) -> dict[Hashable, Optional[Exception]]:
+        """
+        Sends all pending mutations in parallel and waits for them to finish.
+        Returns a dict mapping the key of every sent mutation to the raised exception, or None on success.
+        Failures of background flushes since the last call are included as well.
+        """
+
+        self._cancel_timer()
+
+        # background flushes that are still running add their failures to errors
+        await asyncio.gather(*self._background_flushes, return_exceptions=True)
+        report = await self._send_pending()
+
+        errors, self.errors = self.errors, {}
+        return {**errors, **report}
+
+    async def _send_pending(self) -> dict[Hashable, Optional[Exception]]:
+        """
+        Sends all pending mutations in parallel and returns the result of every mutation
+        """
+
+        # only one flush runs at a time so that mutations of the same key are sent in order
+        async with self._flush_lock:
+            pending = self._pending
+            self._pending = {}
+            self._background_flush_waiting = False
+
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+
+            async def run(action: Callable[[], Awaitable]) -> Optional[Exception]:
+                async with semaphore:
+                    try:
+                        await action()
+                    except Exception as e:
+                        return e
+
+                return None
+
+            results = await asyncio.gather(
+                *(run(action) for action in pending.values())
+            )
+            return dict(zip(pending.keys(), results))
+
+
+class WriteQueueError(Exception):
+    """
+    Raised if queued mutations could not be sent to the db
+    """
+
+    def __init__(self, errors: dict[Hashable, Exception]):
+        super().__init__(
+            f"Failed to send {len(errors)} queued mutation(s): {list(errors)}"
+        )
+        self.errors = errors
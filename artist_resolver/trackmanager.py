@@ -4,9 +4,30 @@ import re
 import json
 import httpx
 import asyncio
+import codecs
+import contextlib
+import importlib.util
+import logging
+from collections.abc import AsyncIterable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlencode
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional
 from mutagen import id3
+from artist_resolver.cache import (
+    BloomFilter,
+    PersistentResponseCache,
+    ResponseCache,
+    TagCache,
+)
+from artist_resolver.limiter import AdaptiveLimiter
+from artist_resolver.sync import (
+    SyncOperation,
+    SyncPlan,
+    WriteBehindQueue,
+    WriteQueueError,
+)
+
+logger = logging.getLogger(__name__)
 
 
 class Alias:
@@ -54,6 +75,9 @@ class Alias:
 
 
 class MbArtistDetails:
+    # properties that are stored in the db and need to be synced when changed
+    tracked_properties = ("include", "custom_name", "custom_original_name")
+
     def __init__(
         self,
         name: str,
@@ -82,6 +106,7 @@ class MbArtistDetails:
         self.has_server_data: bool = False
         self.updated_from_server: bool = False
         self.invalid_relation: bool = False
+        self.server_state: Optional[dict] = None
 
     def __str__(self):
         return f"{self.name}"
@@ -89,6 +114,39 @@ class MbArtistDetails:
     def __repr__(self):
         return f"{self.name}"
 
+    @property
+    def dirty_properties(self) -> list[str]:
+        """
+        Returns the tracked properties that differ from the last known db state.
+        All tracked properties are considered dirty if the db state is unknown.
+        """
+
+        if self.server_state is None:
+            return list(self.tracked_properties)
+
+        return [
+            prop
+            for prop in self.tracked_properties
+            if getattr(self, prop) != self.server_state[prop]
+        ]
+
+    @property
+    def is_dirty(self) -> bool:
+        """
+        Returns true if the artist has changes that are not stored in the db
+        """
+
+        return bool(self.dirty_properties)
+
+    def mark_clean(self) -> None:
+        """
+        Records the current values of all tracked properties as the db state
+        """
+
+        self.server_state = {
+            prop: getattr(self, prop) for prop in self.tracked_properties
+        }
+
     @property
     def custom_name_edited(self) -> bool:
         """
@@ -120,6 +178,7 @@ class MbArtistDetails:
         self.id = data["id"]
         self.type = data["type"]
         self.has_server_data = True
+        self.mark_clean()
 
     @classmethod
     def from_dict(cls, data: dict, artist_list: list["MbArtistDetails"]):
@@ -429,6 +488,7 @@ class SimpleArtistDetails(MbArtistDetails):
         self.custom_original_name = data["name"]
         self.id = data["artistId"]
         self.has_server_data = True
+        self.mark_clean()
 
     @staticmethod
     def split_artist_list(artist_list: list[str]) -> list[str]:
@@ -528,26 +588,47 @@ class SimpleArtistDetails(MbArtistDetails):
         Determines correct product for an artist based on a product list
         """
 
-        product = {"id": None, "name": None}
+        return SimpleArtistDetails.resolve_simple_artist_franchise(
+            track_product,
+            track_album_artist,
+            SimpleArtistDetails.build_franchise_index(product_list),
+        )
+
+    @staticmethod
+    def build_franchise_index(product_list: list[dict]) -> dict:
+        """
+        Creates a lookup of franchise name to franchise from a product list
+        """
+
+        franchise_index = {}
+        for product in product_list:
+            # keep the first entry for duplicate names, same as a linear search would
+            franchise_index.setdefault(product["name"], product)
+
+        return franchise_index
+
+    @staticmethod
+    def resolve_simple_artist_franchise(
+        track_product, track_album_artist, franchise_index: dict
+    ) -> dict:
+        """
+        Determines correct product for an artist based on a franchise index
+        """
 
         if track_product:
-            product["name"] = track_product
+            product_name = track_product
         elif track_album_artist:
-            product["name"] = track_album_artist
+            product_name = track_album_artist
         else:
             # the default product indicating that the track doesn't belong to a franchise is _
-            product["name"] = "_"
+            product_name = "_"
 
-        resolved_product = [
-            p for p in product_list if p["name"] == product["name"].replace(" ", "")
-        ]
+        resolved_product = franchise_index.get(product_name.replace(" ", ""))
 
         if resolved_product:
-            return resolved_product[0]
+            return resolved_product
 
-        default_product = [p for p in product_list if p["name"] == "_"]
-
-        return default_product[0]
+        return franchise_index["_"]
 
 
 class TrackDetails:
@@ -584,6 +665,8 @@ class TrackDetails:
         self.artist_relations = None
         self.update_file: bool = True
         self.artist_details: List[MbArtistDetails] = []
+        self.id3: Optional[id3.ID3] = None
+        self.tags_read: bool = False
 
     def __str__(self):
         return f"{self.title}"
@@ -651,33 +734,89 @@ class TrackDetails:
         txxx = id3.getall(f"TXXX:{description}")
         return txxx[0].text[0] if txxx else None
 
-    async def read_file_metadata(self, read_artist_json: bool = True) -> None:
+    async def read_file_metadata(
+        self, read_artist_json: bool = True, retain_id3: bool = True
+    ) -> None:
         """
-        Reads mp3 tags from a file
+        Reads mp3 tags from a file.
+        If retain_id3 is not set, the parsed tags are discarded after reading
+        and loaded again when the file is saved.
+        If the manager uses a tag cache, unchanged files are loaded from the cache
+        without being opened. The cache is accessed on the read thread pool.
         """
 
-        self.id3 = await self.get_id3_object(self.file_path)
-        for tag, mapping in self.tag_mappings.items():
-            # some metadata needs to be handled differently
+        tag_cache = self.manager.tag_cache if self.manager else None
+        tag_values = None
+        loop = asyncio.get_event_loop()
+
+        if tag_cache is not None:
+            stat = await self.get_file_stat()
+            tag_values = await loop.run_in_executor(
+                self.manager.read_executor, tag_cache.get, self.file_path, stat
+            )
 
-            value = TrackDetails.get_id3_value(self.id3, tag)
-            setattr(self, mapping["property"], value)
+        if tag_values is None:
+            file_id3 = await self.get_id3_object(self.file_path)
+            tag_values = TrackDetails.read_tag_values(file_id3)
+            self.id3 = file_id3 if retain_id3 else None
+
+            if tag_cache is not None:
+                await loop.run_in_executor(
+                    self.manager.read_executor,
+                    tag_cache.set,
+                    self.file_path,
+                    stat,
+                    tag_values,
+                )
+        else:
+            # tags are loaded from the file when it is saved
+            self.id3 = None
 
-        for description, mapping in self.txxx_mappings.items():
-            value = TrackDetails.get_txxx_value(self.id3, description)
-            setattr(self, mapping["property"], value)
+        for mapping in [*self.tag_mappings.values(), *self.txxx_mappings.values()]:
+            setattr(self, mapping["property"], tag_values[mapping["property"]])
 
-            # the artist_relations array is not a specific ID3 tag but is stored as text in the general purpose TXXX frame
+        # the artist_relations array is not a specific ID3 tag but is stored as text in the general purpose TXXX frame
         if read_artist_json:
-            self.artist_relations = TrackDetails.get_txxx_value(
-                self.id3, "artist_relations_json"
-            )
+            self.artist_relations = tag_values["artist_relations"]
 
         if self.artist is None:
             self.artist = []
 
+        self.tags_read = True
+
         await self.create_artist_objects()
 
+    @staticmethod
+    def read_tag_values(file_id3: id3.ID3) -> dict:
+        """
+        Returns the values of all mapped tags of an id3 object, keyed by property name
+        """
+
+        tag_values = {}
+        for tag, mapping in TrackDetails.tag_mappings.items():
+            # some metadata needs to be handled differently
+            tag_values[mapping["property"]] = TrackDetails.get_id3_value(file_id3, tag)
+
+        for description, mapping in TrackDetails.txxx_mappings.items():
+            tag_values[mapping["property"]] = TrackDetails.get_txxx_value(
+                file_id3, description
+            )
+
+        tag_values["artist_relations"] = TrackDetails.get_txxx_value(
+            file_id3, "artist_relations_json"
+        )
+
+        return tag_values
+
+    async def get_file_stat(self) -> os.stat_result:
+        """
+        Returns the file attributes used to check if cached tags of the file are still current
+        """
+
+        executor = self.manager.read_executor if self.manager else None
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(executor, os.stat, self.file_path)
+
     async def create_artist_objects(self) -> None:
         """
         Creates artist objects from id3 tags of a file
@@ -697,8 +836,9 @@ class TrackDetails:
         Creates object for a file used to read from a file. Moved to separate function to make testing easier
         """
 
+        executor = self.manager.read_executor if self.manager else None
         loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, lambda: id3.ID3(file_path))
+        return await loop.run_in_executor(executor, lambda: id3.ID3(file_path))
 
     def apply_custom_tag_values(self) -> None:
         """
@@ -721,6 +861,16 @@ class TrackDetails:
         """
         file_changed: bool = False
 
+        if self.id3 is None:
+            if not self.tags_read:
+                # saving empty properties would remove all tags from the file
+                raise ValueError(
+                    f"Tags of {self.file_path} were not read, the file can't be saved."
+                )
+
+            # tags were not retained after reading the file
+            self.id3 = id3.ID3(self.file_path)
+
         for tag, mapping in self.tag_mappings.items():
             value = getattr(self, mapping["property"])
             file_value = TrackDetails.get_id3_value(self.id3, tag)
@@ -760,232 +910,1579 @@ class TrackDetails:
             self.id3.save(self.file_path)
 
 
+def h2_available() -> bool:
+    """
+    Checks if the optional h2 package needed for http2 support is installed
+    """
+
+    return importlib.util.find_spec("h2") is not None
+
+
+class JsonArrayDecoder:
+    """
+    Decodes the items of a json array from text that arrives in chunks,
+    so that items can be used before the complete array was received.
+    """
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._started = False
+        self._finished = False
+        self._expect_separator = False
+        self._expect_item = False
+
+    def feed(self, text: str, final: bool = False) -> list:
+        """
+        Adds a chunk of text and returns all items that were completed by it.
+        final must be set for the last chunk, to decode the last item and check that the array is complete.
+        """
+
+        buffer = self._buffer + text
+        position = 0
+        items = []
+
+        while True:
+            while position < len(buffer) and buffer[position].isspace():
+                position += 1
+
+            if position >= len(buffer):
+                break
+
+            if self._finished:
+                raise ValueError("Unexpected data after json array.")
+
+            char = buffer[position]
+
+            if not self._started:
+                if char == "[":
+                    self._started = True
+                    position += 1
+                elif buffer.startswith("null", position):
+                    # empty list endpoints can return null instead of an empty array
+                    self._finished = True
+                    position += 4
+                elif "null".startswith(buffer[position:]) and not final:
+                    break
+                else:
+                    raise ValueError("Expected a json array.")
+            elif char == "]":
+                if self._expect_item:
+                    raise ValueError(
+                        f"Unexpected ']' after ',' at position {position}."
+                    )
+
+                self._finished = True
+                position += 1
+            elif self._expect_separator:
+                if char != ",":
+                    raise ValueError(f"Expected ',' at position {position}.")
+
+                self._expect_separator = False
+                self._expect_item = True
+                position += 1
+            else:
+                try:
+                    item, end = self._decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if final:
+                        raise
+
+                    break
+
+                # an item ending at the end of the buffer could still be incomplete, e.g. a number
+                if end == len(buffer) and not final:
+                    break
+
+                items.append(item)
+                position = end
+                self._expect_separator = True
+                self._expect_item = False
+
+        self._buffer = buffer[position:]
+
+        if final and self._started and not self._finished:
+            raise ValueError("Incomplete json array.")
+
+        return items
+
+
 class TrackManager:
     SIMPLE_ARTIST_API_ENDPOINT = "api/artist"
     SIMPLE_ARTIST_ALIAS_API_ENDPOINT = "api/alias"
     SIMPLE_ARTIST_FRANCHISE_API_ENDPOINT = "api/franchise"
     MBARTIST_API_ENDPOINT = "api/mbartist"
+    DELTA_SYNC_ENDPOINTS = (
+        MBARTIST_API_ENDPOINT,
+        SIMPLE_ARTIST_API_ENDPOINT,
+        SIMPLE_ARTIST_ALIAS_API_ENDPOINT,
+        SIMPLE_ARTIST_FRANCHISE_API_ENDPOINT,
+    )
+    # an http/1.1 server drops the connection as soon as it receives
+    # the http2 preface, which surfaces as one of these errors
+    HTTP2_FALLBACK_ERRORS = (httpx.ProtocolError, httpx.ReadError, httpx.WriteError)
     API_PORT = 23409
     API_DOMAIN = "localhost"
+    MAX_CONNECTIONS = 20
+    MAX_KEEPALIVE_CONNECTIONS = 10
+    KEEPALIVE_EXPIRY = 30
+    READ_WORKERS = 32
+    SCAN_BATCH_SIZE = 256
+    WRITE_WORKERS = 8
 
-    def __init__(self, host: str = None, port: str = None):
+    def __init__(
+        self,
+        host: str = None,
+        port: str = None,
+        max_connections: int = None,
+        max_keepalive_connections: int = None,
+        prefetch_franchises: bool = False,
+        response_cache: ResponseCache = None,
+        persistent_cache: PersistentResponseCache = None,
+        negative_cache: ResponseCache = None,
+        write_queue: WriteBehindQueue = None,
+        limiter: AdaptiveLimiter = None,
+        uds: str = None,
+        http2: bool = False,
+        stream_lists: bool = False,
+        read_workers: int = None,
+        write_workers: int = None,
+        tag_cache: TagCache = None,
+    ):
         self.tracks: list[TrackDetails] = []
         self.artist_data: dict[MbArtistDetails] = {}
         self.api_host = host if host is not None else self.API_DOMAIN
         self.api_port = port if port is not None else self.API_PORT
+        self.max_connections = (
+            max_connections if max_connections is not None else self.MAX_CONNECTIONS
+        )
+        self.max_keepalive_connections = (
+            max_keepalive_connections
+            if max_keepalive_connections is not None
+            else self.MAX_KEEPALIVE_CONNECTIONS
+        )
+        self.uds = uds
+        if http2 and not h2_available():
+            logger.warning(
+                "http2 was requested but the h2 package is not installed, "
+                "falling back to http/1.1. Install the http2 extra to enable it."
+            )
+        self.http2 = http2 and h2_available()
+        self._http2_confirmed = False
+        self.stream_lists = stream_lists
+        self.sync_cursors: dict[str, str] = {}
+        self.read_workers = (
+            read_workers if read_workers is not None else self.READ_WORKERS
+        )
+        self.write_workers = (
+            write_workers if write_workers is not None else self.WRITE_WORKERS
+        )
+        self._read_executor: Optional[ThreadPoolExecutor] = None
+        self.tag_cache = tag_cache
+        self._write_executor: Optional[ThreadPoolExecutor] = None
+        self._cache_executor: Optional[ThreadPoolExecutor] = None
+        self.transfer_metrics = {
+            "responses": 0,
+            "bytes_transferred": 0,
+            "bytes_decoded": 0,
+        }
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._retired_clients: list[httpx.AsyncClient] = []
+        self._in_flight_requests: dict[tuple[str, str], asyncio.Future] = {}
+        self.response_cache = response_cache
+        self.persistent_cache = persistent_cache
+        self.negative_cache = negative_cache
+        self.write_queue = write_queue
+        self.limiter = limiter
+        self.known_mbids: Optional[BloomFilter] = None
+        self.simple_artists_by_name: Optional[dict[str, dict]] = None
+        self.simple_artists_by_id: Optional[dict[int, dict]] = None
+        self.prefetch_franchises = prefetch_franchises
+        self.db_products: Optional[list[dict]] = None
+        self.db_product_index: dict = {}
+        self._franchise_lock = asyncio.Lock()
 
-    def clear_data(self) -> None:
-        """
-        Removes all data from the class instance
-        """
+    async def __aenter__(self) -> "TrackManager":
+        if self.prefetch_franchises:
+            await self.load_simple_artist_franchises()
 
-        self.tracks: list[TrackDetails] = []
-        self.artist_data: dict[MbArtistDetails] = {}
+        return self
 
-    def remove_track(self, track: TrackDetails) -> None:
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
         """
-        Removes a track from the tracks property and updates the artist_data property accordingly.
+        Sends all queued mutations, commits pending entries of the persistent cache,
+        closes the shared http client and all pooled connections and shuts down the thread pools.
+        Raises a WriteQueueError with the failed mutations if any queued mutation could not be sent.
         """
-        # Remove the track from the tracks list
-        self.tracks.remove(track)
-
-        # Create a set of all artist MBIDs that are still referenced by remaining tracks
-        referenced_artist_mbids = set()
-        for track in self.tracks:
-            for artist in track.artist_details:
-                referenced_artist_mbids.add(artist.mbid)
 
-        # Remove artists from artist_data if they are no longer referenced by any tracks
-        self.artist_data = {
-            mbid: artist
-            for mbid, artist in self.artist_data.items()
-            if mbid in referenced_artist_mbids
-        }
+        errors = {}
+        if self.write_queue is not None:
+            report = await self.flush()
+            errors = {key: error for key, error in report.items() if error is not None}
 
-        # Remove track references from the track manager
-        track.manager = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
-    async def load_files(self, files: list[str], read_artist_json: bool = True) -> None:
-        """
-        Loads the provided list of MP3 files and reads their ID3 tags.
-        Throws an exception if any file is not an MP3 file.
-        """
-        self.validate_files(files)
-        loaded_file_paths = {os.path.normpath(track.file_path) for track in self.tracks}
-        new_tracks = []
+        for client in self._retired_clients:
+            await client.aclose()
+        self._retired_clients = []
 
-        for file in files:
-            normalized_file = os.path.normpath(file)
+        if self.persistent_cache is not None:
+            await self.run_in_cache_executor(self.persistent_cache.commit)
 
-            if normalized_file in loaded_file_paths:
-                continue  # Skip loading if the file has already been loaded
-            new_track = TrackDetails(normalized_file, self)
-            self.tracks.append(new_track)
-            new_tracks.append(new_track)
-            loaded_file_paths.add(normalized_file)
+        self.shutdown_executors()
 
-        await self.read_files(new_tracks, read_artist_json)
+        if errors:
+            raise WriteQueueError(errors)
 
-    def validate_files(self, files: list[str]) -> None:
+    @property
+    def read_executor(self) -> ThreadPoolExecutor:
         """
-        Validates if all the provided files are MP3 files.
-        Throws an exception if any file is not an MP3 file.
+        Returns the thread pool used to read id3 tags, creating it on first use
         """
-        for file in files:
-            if not file.endswith(".mp3"):
-                raise ValueError(
-                    f"Invalid file type for {file}. Only MP3 files are allowed."
-                )
 
-    async def save_files(self) -> None:
+        if self._read_executor is None:
+            self._read_executor = ThreadPoolExecutor(
+                max_workers=self.read_workers, thread_name_prefix="id3-read"
+            )
+
+        return self._read_executor
+
+    @property
+    def write_executor(self) -> ThreadPoolExecutor:
         """
-        Saves changed id3 tags for all files in the local tracks list
+        Returns the thread pool used to write id3 tags, creating it on first use
         """
 
-        loop = asyncio.get_event_loop()
+        if self._write_executor is None:
+            self._write_executor = ThreadPoolExecutor(
+                max_workers=self.write_workers, thread_name_prefix="id3-write"
+            )
 
-        for track in self.tracks:
-            if track.update_file is True:
-                track.apply_custom_tag_values()
+        return self._write_executor
 
-        await asyncio.gather(
-            *(
-                loop.run_in_executor(None, track.save_file_metadata)
-                for track in self.tracks
-                if track.update_file is True
+    @property
+    def cache_executor(self) -> ThreadPoolExecutor:
+        """
+        Returns the thread used to access the persistent response cache, creating it on first use
+        """
+
+        if self._cache_executor is None:
+            self._cache_executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="response-cache"
             )
-        )
 
-    async def read_files(
-        self, tracks: list[TrackDetails], read_artist_json: bool = True
-    ) -> None:
+        return self._cache_executor
+
+    async def run_in_cache_executor(self, func, *args):
         """
-        Reads ID3 tags for the provided list of tracks.
+        Runs a call to the persistent response cache on its thread, so that sqlite
+        doesn't block the event loop
         """
-        await asyncio.gather(
-            *(track.read_file_metadata(read_artist_json) for track in tracks)
-        )
 
-    async def update_artists_info_from_db(self) -> None:
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self.cache_executor, func, *args)
+
+    def shutdown_executors(self) -> None:
         """
-        Update artist information from the database for all artists
-        in the local artist_data list
+        Shuts down the tag i/o and cache thread pools. Jobs that were already submitted still finish.
         """
 
-        for artist in self.artist_data.values():
-            if artist.updated_from_server:
-                continue
+        for executor in (
+            self._read_executor,
+            self._write_executor,
+            self._cache_executor,
+        ):
+            if executor is not None:
+                executor.shutdown(wait=False)
 
-            if isinstance(artist, SimpleArtistDetails):
-                await self.update_simple_artist_from_db(artist)
-            else:
-                await self.update_mbartist_from_db(artist)
+        self._read_executor = None
+        self._write_executor = None
+        self._cache_executor = None
 
-    async def update_simple_artist_from_db(self, artist: SimpleArtistDetails) -> None:
+    @property
+    def api_base_url(self) -> str:
         """
-        Loads customized artist and alias data for a simple artist from the database.
+        Returns the base url of the api
         """
 
-        alias = await self.get_simple_artist_alias(artist.name, artist.product_id)
-        # No matter if there was any information available, the artist should be marked
-        # as updated from server to prevent duplicate checks
-        artist.updated_from_server = True
-        if alias:
-            artist.update_from_simple_artist_dict(alias[0])
+        return f"http://{self.api_host}:{self.api_port}"
 
-    async def update_mbartist_from_db(self, artist: MbArtistDetails) -> None:
+    @property
+    def client(self) -> httpx.AsyncClient:
         """
-        Loads customized artist data for an mb artist from the database.
+        Returns the shared http client used for all api calls, creating it on first use.
+        Pooled connections can only be used by the event loop that opened them, so a new client
+        is created when the manager is used from another event loop, e.g. by separate asyncio.run calls.
         """
 
-        mb_artist_details = await self.get_mbartist(artist.mbid)
-        artist.updated_from_server = True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
 
-        if mb_artist_details:
-            artist.update_from_customization(mb_artist_details)
+        if self._client is not None and self._client_loop is not loop:
+            # the previous loop is usually closed already, so its client can't be closed anymore
+            self._client = None
+            self._retired_clients = []
+            self._franchise_lock = asyncio.Lock()
 
-    async def create_artist_details_from_simple_artist_track(
-        self, track: TrackDetails
-    ) -> list[SimpleArtistDetails]:
-        """
-        Reads track data to create a list of artist details, pushes it to the local artist_data list
-        """
+        if self._client is None or self._client.is_closed:
+            self._client = self.create_client()
+            self._client_loop = loop
 
-        if not hasattr(self, "db_products") or not self.db_products:
-            self.db_products = await self.list_simple_artist_franchise()
+        return self._client
 
-        returnObj: list[SimpleArtistDetails] = []
+    def create_client(self) -> httpx.AsyncClient:
+        """
+        Creates the pooled http client used for all api calls.
+        If a unix domain socket path is set, requests are sent through the socket instead of tcp.
+        In http2 mode, all requests are multiplexed over http2 with prior knowledge,
+        since the api is served over plain http.
+        Responses are requested with gzip, and with brotli and zstd if the compression extra is installed.
+        """
 
-        product = SimpleArtistDetails.parse_simple_artist_franchise(
-            track.product, track.album_artist, self.db_products
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.KEEPALIVE_EXPIRY,
         )
-        track.product = product["name"]
-        artist_details = SimpleArtistDetails.parse_simple_artist(
-            track.artist, product["name"], product["id"]
+
+        transport = httpx.AsyncHTTPTransport(
+            uds=self.uds,
+            limits=limits,
+            http1=not self.http2,
+            http2=self.http2,
         )
+        return httpx.AsyncClient(transport=transport)
 
-        for artist in artist_details:
-            if artist.mbid not in self.artist_data:
-                self.artist_data[artist.mbid] = artist
+    @property
+    def client_metrics(self) -> dict:
+        """
+        Returns the number of bytes received over the network and after decompression
+        """
 
-            returnObj.append(self.artist_data[artist.mbid])
+        metrics = dict(self.transfer_metrics)
+        metrics["bytes_saved"] = metrics["bytes_decoded"] - metrics["bytes_transferred"]
+        return metrics
 
-        return returnObj
+    def record_transfer(self, response: httpx.Response) -> None:
+        """
+        Adds the transfer and decoded size of a response to the client metrics
+        """
 
-    def parse_mbartist_json(self, artist_relations_json: str) -> list[MbArtistDetails]:
+        self.transfer_metrics["responses"] += 1
+        self.transfer_metrics["bytes_transferred"] += response.num_bytes_downloaded
+        self.transfer_metrics["bytes_decoded"] += len(response.content)
+
+    async def fallback_to_http1(self, failed_client: httpx.AsyncClient) -> None:
         """
-        Reads track data to create a list of artist details, pushes it to the local artist_data list
+        Disables http2 and replaces the shared http client with an http/1.1 client.
+        The failed client is only closed by aclose, since parallel requests may still be using it.
         """
 
-        artist_details = MbArtistDetails.parse_json(artist_relations_json)
-        returnObj: List[MbArtistDetails] = []
-        for artist in artist_details:
-            if artist.mbid not in self.artist_data:
-                self.artist_data[artist.mbid] = artist
+        self.http2 = False
+        if self._client is failed_client:
+            self._client = None
+            self._retired_clients.append(failed_client)
 
-            returnObj.append(self.artist_data[artist.mbid])
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        cached: bool = False,
+        invalidates: str = None,
+        **kwargs,
+    ) -> httpx.Response:
+        """
+        Sends a request to the api using the shared http client.
+        Identical GET requests that are already in flight are not sent again,
+        all callers wait for and receive the response of the first request instead.
+        If cached is set, successful GET responses are served from the response cache.
+        If invalidates is set, all cached responses with an url starting with it are
+        discarded once the request was sent.
+        """
+
+        if method != "GET":
+            try:
+                return await self._send(method, url, **kwargs)
+            finally:
+                if invalidates:
+                    self.invalidate_cached_responses(invalidates)
+
+        if cached:
+            for cache in (self.response_cache, self.negative_cache):
+                cached_response = cache.get(url) if cache is not None else None
+                if cached_response is not None:
+                    return cached_response
+
+        key = (method, url)
+        in_flight = self._in_flight_requests.get(key)
+
+        if in_flight is None:
+            in_flight = asyncio.ensure_future(
+                self._send_and_cache(method, url, cached, **kwargs)
+            )
+            self._in_flight_requests[key] = in_flight
+            in_flight.add_done_callback(
+                lambda future: self._remove_in_flight_request(key, future)
+            )
 
-        return returnObj
+        # shield the shared request so that a cancelled caller doesn't cancel it for everyone else
+        return await asyncio.shield(in_flight)
 
-    def replace_original_title(self, overwrite: bool = False) -> None:
+    def _remove_in_flight_request(self, key: tuple[str, str], future) -> None:
         """
-        Replaces the value of original_title with the value from title for all tracks.
+        Removes a finished request from the list of in flight requests
         """
 
-        for track in self.tracks:
-            if overwrite or (not track.original_title):
-                track.original_title = track.title
+        if self._in_flight_requests.get(key) is future:
+            del self._in_flight_requests[key]
 
-    def replace_original_artist(self, overwrite: bool = False) -> None:
+        # mark the exception as retrieved in case every caller was cancelled
+        if not future.cancelled():
+            future.exception()
+
+    async def _send_and_cache(
+        self, method: str, url: str, cached: bool, **kwargs
+    ) -> httpx.Response:
         """
-        Replaces the value of original_artist with the value from artist for all tracks.
+        Sends a single request and stores successful responses in the response caches.
+        Responses in the persistent cache are used without a request while they are fresh,
+        and are revalidated with their ETag afterwards. Negative responses are persisted as well
+        and used until they expire. The persistent cache is accessed on its own thread.
         """
 
-        for track in self.tracks:
-            if overwrite or (not track.original_artist):
-                track.original_artist = track.artist
+        persistent_entry = None
+        if cached and self.persistent_cache is not None:
+            persistent_entry = await self.run_in_cache_executor(
+                self.persistent_cache.get, url
+            )
+
+        if persistent_entry and persistent_entry["fresh"]:
+            response = PersistentResponseCache.to_response(url, persistent_entry)
+        else:
+            if persistent_entry and persistent_entry["etag"]:
+                kwargs["headers"] = {
+                    **kwargs.get("headers", {}),
+                    "If-None-Match": persistent_entry["etag"],
+                }
+
+            response = await self._send(method, url, **kwargs)
+
+            if response.status_code == 304 and persistent_entry:
+                await self.run_in_cache_executor(self.persistent_cache.touch, url)
+                response = PersistentResponseCache.to_response(url, persistent_entry)
+            elif (
+                cached
+                and self.persistent_cache is not None
+                and response.status_code in (200, 404)
+            ):
+                await self.run_in_cache_executor(
+                    self.persistent_cache.set,
+                    url,
+                    response,
+                    self.is_empty_response(response),
+                )
+
+        if cached and self.is_empty_response(response):
+            if self.negative_cache is not None:
+                self.negative_cache.set(url, response)
+        elif cached and self.response_cache is not None and response.status_code == 200:
+            self.response_cache.set(url, response)
 
-    async def send_changes_to_db(self) -> None:
+        return response
+
+    @staticmethod
+    def is_empty_response(response: httpx.Response) -> bool:
         """
-        Sends changes for all artists in the local artist_data list to the db
+        Returns true if the response indicates that the requested item doesn't exist in the db
         """
 
-        for artist in self.artist_data.values():
-            if isinstance(artist, SimpleArtistDetails):
-                if artist.include is not True:
-                    continue
-
-                await self.send_simple_artist_changes_to_db(artist)
-                await self.send_simple_artist_alias_changes_to_db(artist)
-            else:
-                await self.send_mbartist_changes_to_db(artist)
+        return response.status_code == 404 or (
+            response.status_code == 200
+            and response.content.strip() in (b"", b"[]", b"null")
+        )
 
-    async def send_mbartist_changes_to_db(self, artist: MbArtistDetails) -> None:
+    def invalidate_cached_responses(self, prefix: str = None) -> None:
         """
-        Sends changes for mb artist artist_data list to the db
+        Discards all cached responses with an url starting with prefix, or all responses if no prefix is provided
         """
 
-        existing_artist = await self.get_mbartist(artist.mbid)
+        if self.response_cache is not None:
+            self.response_cache.invalidate(prefix or "")
+
+        if self.negative_cache is not None:
+            self.negative_cache.invalidate(prefix or "")
+
+        if self.persistent_cache is not None:
+            self.persistent_cache.invalidate(prefix or "")
+
+    def invalidate_cached_response(self, url: str) -> None:
+        """
+        Discards the cached response of a single url
+        """
+
+        for cache in (self.response_cache, self.negative_cache, self.persistent_cache):
+            if cache is not None:
+                cache.invalidate_url(url)
+
+    async def _send(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Sends a single request using the shared http client, within the adaptive limit if a limiter is used.
+        If the api does not speak http2, the request is retried once over http/1.1.
+        """
+
+        async with self._stream(method, url, **kwargs) as response:
+            await response.aread()
+
+        self.record_transfer(response)
+        return response
+
+    @contextlib.asynccontextmanager
+    async def _stream(
+        self, method: str, url: str, **kwargs
+    ) -> AsyncIterator[httpx.Response]:
+        """
+        Sends a single request using the shared http client and yields the response before its body was read.
+        The request is held within the adaptive limit until the response was consumed.
+        If the api does not speak http2, the request is retried once over http/1.1.
+        """
+
+        async with contextlib.AsyncExitStack() as stack:
+            client = self.client
+
+            try:
+                response = await stack.enter_async_context(
+                    self._stream_with_client(client, method, url, **kwargs)
+                )
+            except self.HTTP2_FALLBACK_ERRORS:
+                sent_over_http2 = client in self._retired_clients or (
+                    client is self._client and self.http2
+                )
+                if self._http2_confirmed or not sent_over_http2:
+                    raise
+
+                await self.fallback_to_http1(client)
+                response = await stack.enter_async_context(
+                    self._stream_with_client(self.client, method, url, **kwargs)
+                )
+
+            if self.http2:
+                self._http2_confirmed = True
+
+            yield response
+
+    @contextlib.asynccontextmanager
+    async def _stream_with_client(
+        self, client: httpx.AsyncClient, method: str, url: str, **kwargs
+    ) -> AsyncIterator[httpx.Response]:
+        """
+        Sends a single request using the provided client, within the adaptive limit if a limiter is used
+        """
+
+        request = client.build_request(method, url, **kwargs)
+
+        async def send() -> httpx.Response:
+            return await client.send(request, stream=True)
+
+        async with contextlib.AsyncExitStack() as stack:
+            if self.limiter is None:
+                response = await send()
+            else:
+                response = await stack.enter_async_context(self.limiter.stream(send))
+
+            stack.push_async_callback(response.aclose)
+            yield response
+
+    async def iter_json_list(self, url: str, description: str) -> AsyncIterator[dict]:
+        """
+        Downloads a json array and yields its items while the response is still being received,
+        so that only the items that were not consumed yet are held in memory
+        """
+
+        async with self._stream("GET", url) as response:
+            if response.status_code == 404:
+                return
+
+            if response.status_code != 200:
+                raise Exception(
+                    f"Failed to fetch {description}: {response.status_code}"
+                )
+
+            decoder = JsonArrayDecoder()
+            text_decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")()
+            decoded_size = 0
+
+            async for chunk in response.aiter_bytes():
+                decoded_size += len(chunk)
+                for item in decoder.feed(text_decoder.decode(chunk)):
+                    yield item
+
+            for item in decoder.feed(text_decoder.decode(b"", final=True), final=True):
+                yield item
+
+            self.transfer_metrics["responses"] += 1
+            self.transfer_metrics["bytes_transferred"] += response.num_bytes_downloaded
+            self.transfer_metrics["bytes_decoded"] += decoded_size
+
+    def clear_data(self) -> None:
+        """
+        Removes all data from the class instance
+        """
+
+        self.tracks: list[TrackDetails] = []
+        self.artist_data: dict[MbArtistDetails] = {}
+
+    def remove_track(self, track: TrackDetails) -> None:
+        """
+        Removes a track from the tracks property and updates the artist_data property accordingly.
+        """
+        # Remove the track from the tracks list
+        self.tracks.remove(track)
+
+        # Create a set of all artist MBIDs that are still referenced by remaining tracks
+        referenced_artist_mbids = set()
+        for track in self.tracks:
+            for artist in track.artist_details:
+                referenced_artist_mbids.add(artist.mbid)
+
+        # Remove artists from artist_data if they are no longer referenced by any tracks
+        self.artist_data = {
+            mbid: artist
+            for mbid, artist in self.artist_data.items()
+            if mbid in referenced_artist_mbids
+        }
+
+        # Remove track references from the track manager
+        track.manager = None
+
+    async def load_files(
+        self,
+        files: list[str],
+        read_artist_json: bool = True,
+        max_concurrency: int = None,
+        retain_id3: bool = True,
+    ) -> None:
+        """
+        Loads the provided list of MP3 files and reads their ID3 tags.
+        Throws an exception if any file is not an MP3 file.
+        """
+        new_tracks = self.add_tracks(files)
+        await self.read_files(new_tracks, read_artist_json, max_concurrency, retain_id3)
+
+    async def iter_load_files(
+        self,
+        files: list[str],
+        read_artist_json: bool = True,
+        max_concurrency: int = None,
+        retain_id3: bool = True,
+        ordered: bool = False,
+    ) -> AsyncIterator[TrackDetails]:
+        """
+        Loads the provided list of MP3 files like load_files, but yields every track as soon as
+        its ID3 tags were read and its artist objects were created.
+        Tracks are yielded in the order they finish, or in the order of files if ordered is set.
+        Tracks that were not read yet are removed from the local tracks list once the iterator
+        is closed, so consumers stopping early should close it, e.g. with contextlib.aclosing.
+        """
+
+        new_tracks = self.add_tracks(files)
+        finished_tracks = self.iter_read_files(
+            new_tracks, read_artist_json, max_concurrency, retain_id3, ordered
+        )
+
+        # close the reads right away if the consumer stops early,
+        # so that unread tracks are removed before it continues
+        async with contextlib.aclosing(finished_tracks):
+            async for _, track in finished_tracks:
+                yield track
+
+    async def load_directory(
+        self,
+        root: str,
+        recursive: bool = True,
+        read_artist_json: bool = True,
+        max_concurrency: int = None,
+        retain_id3: bool = True,
+    ) -> list[TrackDetails]:
+        """
+        Loads all MP3 files in a directory and, if recursive is set, its subdirectories.
+        The directory tree is walked while files are read, so reading starts before the walk is complete.
+        Returns the newly loaded tracks in the order they finished loading.
+        """
+
+        new_tracks = []
+        async for _, track in self.iter_read_files(
+            self.iter_directory_tracks(root, recursive),
+            read_artist_json,
+            max_concurrency,
+            retain_id3,
+        ):
+            new_tracks.append(track)
+
+        return new_tracks
+
+    async def iter_directory_tracks(
+        self, root: str, recursive: bool = True
+    ) -> AsyncIterator[TrackDetails]:
+        """
+        Walks a directory tree on the read thread pool and adds a track to the local tracks list
+        for every MP3 file that wasn't loaded yet, yielding each new track as it is found
+        """
+
+        loaded_file_paths = {os.path.normpath(track.file_path) for track in self.tracks}
+        file_paths = TrackManager.scan_directory(root, recursive)
+        loop = asyncio.get_event_loop()
+
+        def next_batch() -> list[str]:
+            return [path for _, path in zip(range(self.SCAN_BATCH_SIZE), file_paths)]
+
+        while batch := await loop.run_in_executor(self.read_executor, next_batch):
+            for file_path in batch:
+                normalized_file = os.path.normpath(file_path)
+
+                if normalized_file in loaded_file_paths:
+                    continue
+
+                new_track = TrackDetails(normalized_file, self)
+                self.tracks.append(new_track)
+                loaded_file_paths.add(normalized_file)
+                yield new_track
+
+    @staticmethod
+    def scan_directory(root: str, recursive: bool = True) -> Iterator[str]:
+        """
+        Yields the paths of all MP3 files in a directory while walking it
+        """
+
+        directories = [root]
+        while directories:
+            with os.scandir(directories.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            directories.append(entry.path)
+                    elif entry.name.endswith(".mp3") and entry.is_file():
+                        yield entry.path
+
+    def add_tracks(self, files: list[str]) -> list[TrackDetails]:
+        """
+        Adds a track to the local tracks list for every file that wasn't loaded yet and returns the new tracks.
+        Throws an exception if any file is not an MP3 file.
+        """
+        self.validate_files(files)
+        loaded_file_paths = {os.path.normpath(track.file_path) for track in self.tracks}
+        new_tracks = []
+
+        for file in files:
+            normalized_file = os.path.normpath(file)
+
+            if normalized_file in loaded_file_paths:
+                continue  # Skip loading if the file has already been loaded
+            new_track = TrackDetails(normalized_file, self)
+            self.tracks.append(new_track)
+            new_tracks.append(new_track)
+            loaded_file_paths.add(normalized_file)
+
+        return new_tracks
+
+    def validate_files(self, files: list[str]) -> None:
+        """
+        Validates if all the provided files are MP3 files.
+        Throws an exception if any file is not an MP3 file.
+        """
+        for file in files:
+            if not file.endswith(".mp3"):
+                raise ValueError(
+                    f"Invalid file type for {file}. Only MP3 files are allowed."
+                )
+
+    async def save_files(self) -> None:
+        """
+        Saves changed id3 tags for all files in the local tracks list
+        """
+
+        loop = asyncio.get_event_loop()
+        tracks = [track for track in self.tracks if track.update_file is True]
+
+        for track in tracks:
+            track.apply_custom_tag_values()
+
+        await asyncio.gather(
+            *(
+                loop.run_in_executor(self.write_executor, track.save_file_metadata)
+                for track in tracks
+            )
+        )
+
+        if self.tag_cache is not None:
+            await self.update_tag_cache(tracks)
+
+    async def update_tag_cache(self, tracks: list[TrackDetails]) -> None:
+        """
+        Stores the current tags of saved tracks in the tag cache, so that
+        entries stay correct for files that were changed by saving them.
+        All entries are written in a single transaction on the read thread pool.
+        """
+
+        loop = asyncio.get_event_loop()
+        stats = await asyncio.gather(*(track.get_file_stat() for track in tracks))
+
+        def store_tag_values() -> None:
+            for track, stat in zip(tracks, stats):
+                if track.id3 is None:
+                    self.tag_cache.invalidate(track.file_path)
+                    continue
+
+                self.tag_cache.set(
+                    track.file_path, stat, TrackDetails.read_tag_values(track.id3)
+                )
+
+            self.tag_cache.commit()
+
+        await loop.run_in_executor(self.read_executor, store_tag_values)
+
+    async def read_files(
+        self,
+        tracks: list[TrackDetails],
+        read_artist_json: bool = True,
+        max_concurrency: int = None,
+        retain_id3: bool = True,
+    ) -> None:
+        """
+        Reads ID3 tags for the provided list of tracks.
+        At most max_concurrency files are read at the same time, defaulting to the size
+        of the read thread pool, so that the number of open files stays bounded.
+        If retain_id3 is not set, parsed tags are not kept in memory after reading.
+        """
+
+        async for _ in self.iter_read_files(
+            tracks, read_artist_json, max_concurrency, retain_id3
+        ):
+            pass
+
+    async def iter_read_files(
+        self,
+        tracks: Iterable[TrackDetails] | AsyncIterable[TrackDetails],
+        read_artist_json: bool = True,
+        max_concurrency: int = None,
+        retain_id3: bool = True,
+        ordered: bool = False,
+    ) -> AsyncIterator[tuple[int, TrackDetails]]:
+        """
+        Reads ID3 tags for the provided tracks and yields the index and track
+        of every read file in the order they finish, or in the order of tracks if ordered is set.
+        At most max_concurrency files are read at the same time, defaulting to the size
+        of the read thread pool. In ordered mode, no further tracks are taken while
+        max_concurrency tracks are read or wait for an earlier track.
+        Tracks can also be provided as an async iterable, in which case they are read
+        while the iterable is still producing them.
+        The first failed read is raised and stops all other reads.
+        If reading stops early, tracks that were not read are removed from the local
+        tracks list, so that they can't be saved with empty tags.
+        Tags stored in the tag cache are committed once all reads finished.
+        """
+
+        if max_concurrency is None:
+            max_concurrency = self.read_workers
+
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1.")
+
+        if not isinstance(tracks, AsyncIterable):
+            tracks = list(tracks)
+
+        # tracks of async iterables are only known once they were taken from the iterable
+        taken_tracks = tracks if isinstance(tracks, list) else []
+        read_tracks: set[int] = set()
+
+        # a fixed number of workers take tracks from a shared iterator,
+        # so only max_concurrency reads are pending at any time
+        pending_tracks = TrackManager.enumerate_tracks(tracks)
+        pending_tracks_lock = asyncio.Lock()
+        finished = asyncio.Queue(maxsize=max_concurrency)
+
+        # tracks finishing ahead of their turn wait here until all previous tracks are done
+        reorder_buffer: dict[int, TrackDetails] = {}
+        next_index = 0
+        taken_count = 0
+        window_moved = asyncio.Event()
+
+        async def read_next_tracks() -> None:
+            nonlocal taken_count
+            while True:
+                async with pending_tracks_lock:
+                    while ordered and taken_count >= next_index + max_concurrency:
+                        window_moved.clear()
+                        await window_moved.wait()
+
+                    next_track = await anext(pending_tracks, None)
+                    taken_count += 1
+
+                if next_track is None:
+                    break
+
+                index, track = next_track
+                if taken_tracks is not tracks:
+                    taken_tracks.append(track)
+
+                try:
+                    await track.read_file_metadata(read_artist_json, retain_id3)
+                except Exception as e:
+                    await finished.put((index, track, e))
+                    return
+
+                read_tracks.add(id(track))
+                await finished.put((index, track, None))
+
+            # signals that this worker is done
+            await finished.put(None)
+
+        workers = [
+            asyncio.ensure_future(read_next_tracks()) for _ in range(max_concurrency)
+        ]
+
+        try:
+            running_workers = len(workers)
+            while running_workers:
+                result = await finished.get()
+                if result is None:
+                    running_workers -= 1
+                    continue
+
+                index, track, error = result
+                if error is not None:
+                    raise error
+
+                if not ordered:
+                    yield index, track
+                    continue
+
+                reorder_buffer[index] = track
+                while next_index in reorder_buffer:
+                    yield next_index, reorder_buffer.pop(next_index)
+                    next_index += 1
+                    window_moved.set()
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+            await asyncio.gather(*workers, return_exceptions=True)
+            await pending_tracks.aclose()
+
+            self.remove_unread_tracks(
+                [track for track in taken_tracks if id(track) not in read_tracks]
+            )
+
+            if self.tag_cache is not None:
+                loop = asyncio.get_event_loop()
+                await loop.run_in_executor(self.read_executor, self.tag_cache.commit)
+
+    def remove_unread_tracks(self, tracks: list[TrackDetails]) -> None:
+        """
+        Removes tracks whose tags were never read from the local tracks list
+        """
+
+        if not tracks:
+            return
+
+        unread_tracks = {id(track) for track in tracks}
+        self.tracks = [track for track in self.tracks if id(track) not in unread_tracks]
+
+        for track in tracks:
+            track.manager = None
+
+    @staticmethod
+    async def enumerate_tracks(
+        tracks: Iterable[TrackDetails] | AsyncIterable[TrackDetails],
+    ) -> AsyncIterator[tuple[int, TrackDetails]]:
+        """
+        Yields the index and track of every track of a regular or async iterable
+        """
+
+        if isinstance(tracks, AsyncIterable):
+            index = 0
+            async for track in tracks:
+                yield index, track
+                index += 1
+        else:
+            for index, track in enumerate(tracks):
+                yield index, track
+
+    async def update_artists_info_from_db(
+        self, max_concurrency: int = None, prefetch_aliases: bool = False
+    ) -> dict[str, Optional[Exception]]:
+        """
+        Update artist information from the database for all artists
+        in the local artist_data list.
+        Artists are processed one after another unless max_concurrency is set, in which case
+        up to max_concurrency artists are refreshed in parallel and failures are reported
+        in the returned dict (mbid -> exception or None) instead of being raised.
+        If prefetch_aliases is set, simple artists are resolved from the complete alias
+        list of their franchise instead of requesting every alias separately.
+        """
+
+        report = {}
+        if prefetch_aliases:
+            report = await self.prefetch_simple_artist_aliases(max_concurrency)
+
+        artists = [
+            artist
+            for artist in self.artist_data.values()
+            if not artist.updated_from_server
+        ]
+
+        if max_concurrency is None:
+            for artist in artists:
+                await self.update_artist_from_db(artist)
+
+            return {**report, **{artist.mbid: None for artist in artists}}
+
+        return {
+            **report,
+            **await self.run_artist_tasks(
+                artists, self.update_artist_from_db, max_concurrency
+            ),
+        }
+
+    async def prefetch_simple_artist_aliases(
+        self, max_concurrency: int = None
+    ) -> dict[str, None]:
+        """
+        Loads the complete alias list once for every franchise referenced by simple artists
+        in the local artist_data list and updates the artists from it.
+        Returns a dict with the mbids of all updated artists. Artists of franchises that
+        could not be loaded are left untouched to be updated individually.
+        """
+
+        artists = [
+            artist
+            for artist in self.artist_data.values()
+            if isinstance(artist, SimpleArtistDetails)
+            and not artist.updated_from_server
+            and artist.product_id
+        ]
+
+        franchise_ids = list(dict.fromkeys(artist.product_id for artist in artists))
+        alias_index: dict[tuple[int, str], dict] = {}
+        loaded_franchise_ids = set()
+
+        async def load_franchise_aliases(franchise_id: int) -> None:
+            if self.stream_lists:
+                async for alias in self.iter_simple_artist_franchise_aliases(
+                    franchise_id
+                ):
+                    alias_index.setdefault((franchise_id, alias["name"]), alias)
+            else:
+                for alias in await self.list_simple_artist_franchise_aliases(
+                    franchise_id
+                ):
+                    alias_index.setdefault((franchise_id, alias["name"]), alias)
+
+            loaded_franchise_ids.add(franchise_id)
+
+        semaphore = asyncio.Semaphore(max_concurrency or 1)
+
+        async def run(franchise_id: int) -> None:
+            async with semaphore:
+                try:
+                    await load_franchise_aliases(franchise_id)
+                except Exception:
+                    # artists of this franchise fall back to individual requests
+                    pass
+
+        await asyncio.gather(*(run(franchise_id) for franchise_id in franchise_ids))
+
+        report = {}
+        for artist in artists:
+            if artist.product_id not in loaded_franchise_ids:
+                continue
+
+            alias = alias_index.get((artist.product_id, artist.name.replace(" ", "")))
+            artist.updated_from_server = True
+            if alias:
+                artist.update_from_simple_artist_dict(alias)
+
+            report[artist.mbid] = None
+
+        return report
+
+    async def update_artist_from_db(self, artist: MbArtistDetails) -> None:
+        """
+        Loads customized data for a single artist from the database
+        """
+
+        if isinstance(artist, SimpleArtistDetails):
+            await self.update_simple_artist_from_db(artist)
+        else:
+            await self.update_mbartist_from_db(artist)
+
+    @staticmethod
+    async def run_artist_tasks(
+        artists: list[MbArtistDetails], action, max_concurrency: int
+    ) -> dict[str, Optional[Exception]]:
+        """
+        Runs an async action for every artist with at most max_concurrency actions in flight.
+        Returns a dict mapping the mbid of every artist to the raised exception, or None on success.
+        """
+
+        return await TrackManager.run_artist_groups(
+            [[artist] for artist in artists], action, max_concurrency
+        )
+
+    @staticmethod
+    async def run_artist_groups(
+        groups: list[list[MbArtistDetails]], action, max_concurrency: int
+    ) -> dict[str, Optional[Exception]]:
+        """
+        Runs an async action for every artist with at most max_concurrency groups in flight.
+        Artists of the same group are processed one after another.
+        Returns a dict mapping the mbid of every artist to the raised exception, or None on success.
+        """
+
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1.")
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+        report: dict[str, Optional[Exception]] = {}
+
+        async def run(group: list[MbArtistDetails]) -> None:
+            async with semaphore:
+                for artist in group:
+                    try:
+                        await action(artist)
+                        report[artist.mbid] = None
+                    except Exception as e:
+                        report[artist.mbid] = e
+
+        await asyncio.gather(*(run(group) for group in groups))
+        return {
+            artist.mbid: report[artist.mbid] for group in groups for artist in group
+        }
+
+    async def update_simple_artist_from_db(self, artist: SimpleArtistDetails) -> None:
+        """
+        Loads customized artist and alias data for a simple artist from the database.
+        """
+
+        alias = await self.get_simple_artist_alias(artist.name, artist.product_id)
+        # No matter if there was any information available, the artist should be marked
+        # as updated from server to prevent duplicate checks
+        artist.updated_from_server = True
+        if alias:
+            artist.update_from_simple_artist_dict(alias[0])
+
+    async def update_mbartist_from_db(self, artist: MbArtistDetails) -> None:
+        """
+        Loads customized artist data for an mb artist from the database.
+        """
+
+        mb_artist_details = await self.get_mbartist(artist.mbid)
+        artist.updated_from_server = True
+
+        if mb_artist_details:
+            artist.update_from_customization(mb_artist_details)
+
+    async def create_artist_details_from_simple_artist_track(
+        self, track: TrackDetails
+    ) -> list[SimpleArtistDetails]:
+        """
+        Reads track data to create a list of artist details, pushes it to the local artist_data list
+        """
+
+        await self.load_simple_artist_franchises()
+
+        returnObj: list[SimpleArtistDetails] = []
+
+        product = SimpleArtistDetails.resolve_simple_artist_franchise(
+            track.product, track.album_artist, self.db_product_index
+        )
+        track.product = product["name"]
+        artist_details = SimpleArtistDetails.parse_simple_artist(
+            track.artist, product["name"], product["id"]
+        )
+
+        for artist in artist_details:
+            if artist.mbid not in self.artist_data:
+                self.artist_data[artist.mbid] = artist
+
+            returnObj.append(self.artist_data[artist.mbid])
+
+        return returnObj
+
+    async def load_simple_artist_franchises(self, refresh: bool = False) -> list[dict]:
+        """
+        Returns the franchise list, downloading it from the db only if it wasn't loaded yet.
+        Concurrent callers wait for the same download, so the list is fetched once per session.
+        """
+
+        if self.db_products and not refresh:
+            return self.db_products
+
+        async with self._franchise_lock:
+            # another caller may have finished loading the list while waiting for the lock
+            if refresh or not self.db_products:
+                if refresh:
+                    self.invalidate_cached_responses(
+                        f"{self.api_base_url}/{self.SIMPLE_ARTIST_FRANCHISE_API_ENDPOINT}"
+                    )
+
+                if self.stream_lists:
+                    await self.stream_simple_artist_franchises()
+                else:
+                    self.db_products = await self.list_simple_artist_franchise()
+                    self.db_product_index = SimpleArtistDetails.build_franchise_index(
+                        self.db_products or []
+                    )
+
+        return self.db_products
+
+    async def stream_simple_artist_franchises(self) -> None:
+        """
+        Downloads the franchise list and adds every franchise to the franchise index as it arrives.
+        The loaded list and index are only replaced once the complete list was received,
+        so that a failed download keeps them consistent.
+        """
+
+        products = []
+        product_index = {}
+
+        async for product in self.iter_json_list(
+            f"{self.api_base_url}/{self.SIMPLE_ARTIST_FRANCHISE_API_ENDPOINT}",
+            "franchises",
+        ):
+            products.append(product)
+            # keep the first entry for duplicate names, same as build_franchise_index
+            product_index.setdefault(product["name"], product)
+
+        self.db_products = products
+        self.db_product_index = product_index
+
+    def invalidate_simple_artist_franchises(self) -> None:
+        """
+        Discards the loaded franchise list so that it is downloaded again on next use
+        """
+
+        self.db_products = None
+        self.db_product_index = {}
+        self.invalidate_cached_responses(
+            f"{self.api_base_url}/{self.SIMPLE_ARTIST_FRANCHISE_API_ENDPOINT}"
+        )
+
+    def parse_mbartist_json(self, artist_relations_json: str) -> list[MbArtistDetails]:
+        """
+        Reads track data to create a list of artist details, pushes it to the local artist_data list
+        """
+
+        artist_details = MbArtistDetails.parse_json(artist_relations_json)
+        returnObj: List[MbArtistDetails] = []
+        for artist in artist_details:
+            if artist.mbid not in self.artist_data:
+                self.artist_data[artist.mbid] = artist
+
+            returnObj.append(self.artist_data[artist.mbid])
+
+        return returnObj
+
+    def replace_original_title(self, overwrite: bool = False) -> None:
+        """
+        Replaces the value of original_title with the value from title for all tracks.
+        """
+
+        for track in self.tracks:
+            if overwrite or (not track.original_title):
+                track.original_title = track.title
+
+    def replace_original_artist(self, overwrite: bool = False) -> None:
+        """
+        Replaces the value of original_artist with the value from artist for all tracks.
+        """
+
+        for track in self.tracks:
+            if overwrite or (not track.original_artist):
+                track.original_artist = track.artist
+
+    async def send_changes_to_db(
+        self, max_concurrency: int = None, bulk: bool = False, strict: bool = False
+    ) -> dict[str, Optional[Exception]]:
+        """
+        Sends changes for all artists in the local artist_data list to the db.
+        Artists are processed one after another unless max_concurrency is set, in which case
+        independent artists are sent in parallel while the alias of a simple artist is still
+        only sent after the artist itself, and simple artists sharing a name are sent one after another. Failures are then reported in the returned
+        dict (mbid -> exception or None) instead of being raised.
+        If bulk is set, the simple artist table is downloaded once up front so that
+        only changes need to be sent for simple artists.
+        Artists that are unchanged since they were loaded from or sent to the db are
+        skipped without any requests, unless strict is set.
+        """
+
+        artists = self.get_artists_to_sync(strict)
+
+        if bulk:
+            await self.load_simple_artist_index()
+
+        try:
+            if max_concurrency is None:
+                for artist in artists:
+                    await self.send_artist_changes_to_db(artist)
+
+                return {artist.mbid: None for artist in artists}
+
+            return await self.run_artist_groups(
+                self.group_artists_by_db_artist(artists),
+                self.send_artist_changes_to_db,
+                max_concurrency,
+            )
+        finally:
+            if bulk:
+                # the lookup is only kept for the duration of the sync to avoid acting on stale data
+                self.clear_simple_artist_index()
+
+    @staticmethod
+    def group_artists_by_db_artist(
+        artists: list[MbArtistDetails],
+    ) -> list[list[MbArtistDetails]]:
+        """
+        Groups artists that map to the same db artist, so that they can be sent one after another.
+        Simple artists with the same name in different franchises are the same db artist.
+        """
+
+        groups: dict[tuple, list[MbArtistDetails]] = {}
+        for artist in artists:
+            if isinstance(artist, SimpleArtistDetails):
+                key = (SimpleArtistDetails, artist.custom_name)
+            else:
+                key = (MbArtistDetails, artist.mbid)
+            groups.setdefault(key, []).append(artist)
+
+        return list(groups.values())
+
+    def get_artists_to_sync(self, strict: bool = False) -> list[MbArtistDetails]:
+        """
+        Returns all artists in the local artist_data list that need to be sent to the db
+        """
+
+        return [
+            artist
+            for artist in self.artist_data.values()
+            if (not isinstance(artist, SimpleArtistDetails) or artist.include is True)
+            and (strict or artist.is_dirty)
+        ]
+
+    async def plan_changes(
+        self, max_concurrency: int = None, bulk: bool = False, strict: bool = False
+    ) -> SyncPlan:
+        """
+        Compares all artists in the local artist_data list with the db and returns the
+        changes needed to sync them, without sending any of them.
+        Only read requests are sent, so this can be used as a dry run of send_changes_to_db.
+        Artists that could not be planned are listed in the errors of the plan.
+        """
+
+        plan = SyncPlan()
+        plan.artists = self.get_artists_to_sync(strict)
+
+        if bulk:
+            await self.load_simple_artist_index()
+
+        try:
+            report = await self.run_artist_tasks(
+                plan.artists,
+                lambda artist: self.plan_artist_changes(artist, plan),
+                max_concurrency or 1,
+            )
+        finally:
+            if bulk:
+                self.clear_simple_artist_index()
+
+        plan.errors = {mbid: error for mbid, error in report.items() if error}
+        return plan
+
+    async def plan_artist_changes(
+        self, artist: MbArtistDetails, plan: SyncPlan
+    ) -> None:
+        """
+        Adds the changes needed to sync a single artist to a plan
+        """
+
+        if not isinstance(artist, SimpleArtistDetails):
+            existing_artist = await self.get_mbartist(artist.mbid)
+
+            if existing_artist is None:
+                plan.add(SyncOperation.CREATE_MBARTIST, artist)
+                return
+
+            plan.resolved_ids[artist.mbid] = existing_artist["id"]
+
+            if (
+                existing_artist["include"] != artist.include
+                or existing_artist["name"] != artist.custom_name
+                or existing_artist["originalName"] != artist.custom_original_name
+            ):
+                plan.add(SyncOperation.UPDATE_MBARTIST, artist, existing_artist["id"])
+
+            return
+
+        # same decisions as send_simple_artist_changes_to_db
+        artist_id = None
+        existing_artist = await self.find_simple_artist(None, artist.custom_name)
+
+        if existing_artist:
+            artist_id = existing_artist[0]["id"]
+        elif not artist.id:
+            plan.add(SyncOperation.CREATE_SIMPLE_ARTIST, artist)
+        else:
+            existing_artist_by_id = await self.find_simple_artist(artist.id, None)
+
+            if not existing_artist_by_id:
+                raise ValueError(f"Artist with ID {artist.id} not found in database.")
+
+            artist_id = existing_artist_by_id[0]["id"]
+            if existing_artist_by_id[0]["name"] != artist.custom_name:
+                plan.add(SyncOperation.UPDATE_SIMPLE_ARTIST, artist, artist_id)
+
+        if artist_id is not None:
+            plan.resolved_ids[artist.mbid] = artist_id
+
+        # same decisions as send_simple_artist_alias_changes_to_db
+        existing_alias = await self.get_simple_artist_alias(
+            artist.name, artist.product_id
+        )
+
+        if existing_alias:
+            existing_alias = existing_alias[0]
+            if artist_id is not None and existing_alias["artistId"] == artist_id:
+                return
+
+            # alias points to the wrong artist or to an artist that is yet to be created
+            plan.add(SyncOperation.DELETE_ALIAS, artist, existing_alias["id"])
+
+        plan.add(SyncOperation.CREATE_ALIAS, artist)
+
+    async def execute_plan(
+        self, plan: SyncPlan, max_concurrency: int = None
+    ) -> dict[str, Optional[Exception]]:
+        """
+        Sends the changes of a plan to the db.
+        Artists are created and updated first, followed by alias deletions and finally
+        alias creations, so that aliases always reference existing artists. Operations of
+        the same phase are sent in parallel with at most max_concurrency requests in flight.
+        Returns a dict mapping the mbid of every planned artist to the raised exception, or None on success.
+        Artists that failed are skipped in later phases.
+        """
+
+        report = {artist.mbid: plan.errors.get(artist.mbid) for artist in plan.artists}
+
+        for artist in plan.artists:
+            if artist.mbid in plan.resolved_ids and report[artist.mbid] is None:
+                artist.id = plan.resolved_ids[artist.mbid]
+
+        # simple artists with the same name are the same db artist and are only created once
+        artist_groups: dict[tuple, list[SyncOperation]] = {}
+        for op in plan.get_operations(*SyncOperation.ARTIST_ACTIONS):
+            if op.action == SyncOperation.CREATE_SIMPLE_ARTIST:
+                key = (op.action, op.artist.custom_name)
+            else:
+                key = (op.action, op.artist.mbid)
+            artist_groups.setdefault(key, []).append(op)
+
+        phases = [
+            list(artist_groups.values()),
+            [[op] for op in plan.alias_deletes],
+            [[op] for op in plan.alias_creates],
+        ]
+
+        for phase in phases:
+            await self.run_operation_groups(phase, report, max_concurrency or 1)
+
+        for artist in plan.artists:
+            if report[artist.mbid] is None:
+                artist.mark_clean()
+
+        return report
+
+    async def run_operation_groups(
+        self,
+        groups: list[list[SyncOperation]],
+        report: dict[str, Optional[Exception]],
+        max_concurrency: int,
+    ) -> None:
+        """
+        Runs groups of operations in parallel, recording failures in the report.
+        Groups containing an artist that already failed are skipped.
+        """
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run(group: list[SyncOperation]) -> None:
+            if any(report[op.artist.mbid] is not None for op in group):
+                return
+
+            async with semaphore:
+                try:
+                    await self.execute_operation(group)
+                except Exception as e:
+                    for op in group:
+                        report[op.artist.mbid] = e
+
+        await asyncio.gather(*(run(group) for group in groups))
+
+    async def execute_operation(self, group: list[SyncOperation]) -> None:
+        """
+        Sends a single operation to the db and applies the result to all artists of the group
+        """
+
+        op = group[0]
+        artist = op.artist
+
+        match op.action:
+            case SyncOperation.CREATE_MBARTIST:
+                await self.post_mbartist(artist)
+            case SyncOperation.UPDATE_MBARTIST:
+                await self.update_mbartist(op.target_id, artist)
+            case SyncOperation.CREATE_SIMPLE_ARTIST:
+                posted_artist = await self.post_simple_artist(artist)
+                for grouped_op in group:
+                    grouped_op.artist.id = posted_artist["id"]
+            case SyncOperation.UPDATE_SIMPLE_ARTIST:
+                updated_artist = await self.update_simple_artist(op.target_id, artist)
+                artist.id = updated_artist["id"]
+            case SyncOperation.DELETE_ALIAS:
+                await self.delete_simple_artist_alias(op.target_id)
+            case SyncOperation.CREATE_ALIAS:
+                await self.post_simple_artist_alias(
+                    artist.id, artist.name, artist.product_id
+                )
+            case _:
+                raise ValueError(f"Unknown sync operation {op.action}.")
+
+    async def send_artist_changes_to_db(self, artist: MbArtistDetails) -> None:
+        """
+        Sends changes for a single artist to the db
+        """
+
+        if isinstance(artist, SimpleArtistDetails):
+            # the alias references the artist id, so the artist needs to be sent first
+            await self.send_simple_artist_changes_to_db(artist)
+            await self.send_simple_artist_alias_changes_to_db(artist)
+        else:
+            await self.send_mbartist_changes_to_db(artist)
+
+        artist.mark_clean()
+
+    async def send_mbartist_changes_to_db(self, artist: MbArtistDetails) -> None:
+        """
+        Sends changes for mb artist artist_data list to the db
+        """
+
+        existing_artist = await self.get_mbartist(artist.mbid)
 
         if existing_artist is None:
             # DB doesn't have artist with the current MBID, create new DB artist
@@ -1011,7 +2508,7 @@ class TrackManager:
         Sends changes for simple artists to the db if it was changed
         """
 
-        existing_artist = await self.get_simple_artist(None, artist.custom_name)
+        existing_artist = await self.find_simple_artist(None, artist.custom_name)
         if existing_artist:
             # if the artist is found in the DB by name, always update local artist ID to match the DB
             artist.id = existing_artist[0]["id"]
@@ -1020,11 +2517,12 @@ class TrackManager:
         if not artist.id:
             # DB artist was not found by name and local data doesn't have ID, create new DB artist
             posted_artist = await self.post_simple_artist(artist)
+            self.add_to_simple_artist_index(posted_artist)
             artist.id = posted_artist["id"]
             return
 
         # retrieve artist by ID to check for changed properties
-        existing_artist_by_id = await self.get_simple_artist(artist.id, None)
+        existing_artist_by_id = await self.find_simple_artist(artist.id, None)
 
         if existing_artist_by_id:
             existing_artist_by_id = existing_artist_by_id[0]
@@ -1037,6 +2535,8 @@ class TrackManager:
             updated_artist = await self.update_simple_artist(
                 existing_artist_by_id["id"], artist
             )
+            self.remove_from_simple_artist_index(existing_artist_by_id)
+            self.add_to_simple_artist_index(updated_artist)
             artist.id = updated_artist["id"]
             return
 
@@ -1046,6 +2546,78 @@ class TrackManager:
         # inconsistent or that there is a bug somewhere in the application
         raise ValueError(f"Artist with ID {artist.id} not found in database.")
 
+    async def load_simple_artist_index(self) -> None:
+        """
+        Downloads all simple artists from the db into a local lookup by name and by id
+        """
+
+        self.simple_artists_by_name = {}
+        self.simple_artists_by_id = {}
+
+        if self.stream_lists:
+            async for simple_artist in self.iter_json_list(
+                f"{self.api_base_url}/{self.SIMPLE_ARTIST_API_ENDPOINT}",
+                "simple artists",
+            ):
+                self.add_to_simple_artist_index(simple_artist)
+            return
+
+        for simple_artist in await self.list_simple_artists():
+            self.add_to_simple_artist_index(simple_artist)
+
+    def clear_simple_artist_index(self) -> None:
+        """
+        Discards the local simple artist lookup so that simple artists are requested from the db again
+        """
+
+        self.simple_artists_by_name = None
+        self.simple_artists_by_id = None
+
+    def add_to_simple_artist_index(self, simple_artist: dict) -> None:
+        """
+        Adds a simple artist returned by the db to the local lookup, if it was loaded
+        """
+
+        if self.simple_artists_by_id is None or not simple_artist:
+            return
+
+        self.simple_artists_by_id[simple_artist["id"]] = simple_artist
+        self.simple_artists_by_name.setdefault(simple_artist["name"], simple_artist)
+
+    def remove_from_simple_artist_index(self, simple_artist: dict) -> None:
+        """
+        Removes a simple artist from the local lookup, if it was loaded
+        """
+
+        if self.simple_artists_by_id is None:
+            return
+
+        self.simple_artists_by_id.pop(simple_artist["id"], None)
+        if self.simple_artists_by_name.get(simple_artist["name"]) is simple_artist:
+            del self.simple_artists_by_name[simple_artist["name"]]
+
+    async def find_simple_artist(self, id: int, name: str) -> Optional[list[dict]]:
+        """
+        Looks up a simple artist by id or name in the local lookup if it was loaded,
+        or in the db otherwise. Returns results in the same format as get_simple_artist.
+        """
+
+        if self.simple_artists_by_id is None:
+            return await self.get_simple_artist(id, name)
+
+        if not id and not name:
+            raise ValueError("No parameters were provided to query.")
+
+        simple_artist = None
+        if id:
+            simple_artist = self.simple_artists_by_id.get(id)
+            if simple_artist and name and simple_artist["name"] != name:
+                simple_artist = None
+        else:
+            simple_artist = self.simple_artists_by_name.get(name)
+
+        return [simple_artist] if simple_artist else None
+
     async def send_simple_artist_alias_changes_to_db(
         self, artist: SimpleArtistDetails
     ) -> None:
@@ -1075,47 +2647,64 @@ class TrackManager:
 
             # if no other conditions apply the alias already exists and is up to date, no action needs to be taken
 
+    def get_mbartist_url(self, mbid: str) -> str:
+        """
+        Returns the url of a mb artist resource
+        """
+
+        return f"{self.api_base_url}/{self.MBARTIST_API_ENDPOINT}/mbid/{mbid}"
+
+    def set_known_mbids(self, mbids: Optional[list[str]]) -> None:
+        """
+        Sets the complete list of mbids stored in the db. Lookups for mbids that are
+        definitely not part of the list are answered locally without a request.
+        Passing None disables the check.
+        """
+
+        self.known_mbids = BloomFilter.from_items(mbids) if mbids is not None else None
+
     async def get_mbartist(self, mbid: str) -> dict:
         """
         Gets mb artist from the database
         """
 
-        endpoint = f"http://{self.api_host}:{self.api_port}/{self.MBARTIST_API_ENDPOINT}/mbid/{mbid}"
+        if self.known_mbids is not None and mbid not in self.known_mbids:
+            return None
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{endpoint}")
+        endpoint = self.get_mbartist_url(mbid)
 
-            match response.status_code:
-                case 200:
-                    artist_info = response.json()
-                    return artist_info
-                case 404:
-                    return None
-                case _:
-                    raise Exception(
-                        f"Failed to fetch artist data for MBID {mbid}: {response.status_code}"
-                    )
+        response = await self._request("GET", f"{endpoint}", cached=True)
+
+        match response.status_code:
+            case 200:
+                artist_info = response.json()
+                return artist_info
+            case 404:
+                return None
+            case _:
+                raise Exception(
+                    f"Failed to fetch artist data for MBID {mbid}: {response.status_code}"
+                )
 
     async def list_simple_artist_franchise(self) -> dict:
         """
         Gets list of all franchise/product items from the db
         """
 
-        endpoint = f"http://{self.api_host}:{self.api_port}/{self.SIMPLE_ARTIST_FRANCHISE_API_ENDPOINT}"
+        endpoint = f"{self.api_base_url}/{self.SIMPLE_ARTIST_FRANCHISE_API_ENDPOINT}"
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{endpoint}")
-            if response.status_code == 200:
-                return response.json()
-            else:
-                return None
+        response = await self._request("GET", f"{endpoint}", cached=True)
+        if response.status_code == 200:
+            return response.json()
+        else:
+            return None
 
     async def get_simple_artist_franchise(self, name: str = None) -> dict:
         """
         Gets franchise/artist from the db
         """
 
-        endpoint = f"http://{self.api_host}:{self.api_port}/{self.SIMPLE_ARTIST_FRANCHISE_API_ENDPOINT}"
+        endpoint = f"{self.api_base_url}/{self.SIMPLE_ARTIST_FRANCHISE_API_ENDPOINT}"
 
         if not name:
             raise ValueError("No parameters were provided to query.")
@@ -1125,21 +2714,32 @@ class TrackManager:
 
         query_string = urlencode(params)
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{endpoint}?{query_string}")
-            if response.status_code == 200:
-                return response.json()
-            else:
-                return None
+        response = await self._request("GET", f"{endpoint}?{query_string}")
+        if response.status_code == 200:
+            return response.json()
+        else:
+            return None
 
-    async def get_simple_artist(self, id: int, name: str) -> dict:
+    async def list_simple_artists(self) -> list[dict]:
         """
-        Gets details for a simple artist from the database
+        Gets list of all simple artists from the db
         """
 
-        endpoint = (
-            f"http://{self.api_host}:{self.api_port}/{self.SIMPLE_ARTIST_API_ENDPOINT}"
-        )
+        endpoint = f"{self.api_base_url}/{self.SIMPLE_ARTIST_API_ENDPOINT}"
+
+        response = await self._request("GET", f"{endpoint}")
+
+        if response.status_code != 200:
+            raise Exception(f"Failed to fetch simple artists: {response.status_code}")
+
+        return response.json() or []
+
+    def get_simple_artist_url(self, id: int, name: str) -> str:
+        """
+        Returns the url to query a simple artist by id, name or both
+        """
+
+        endpoint = f"{self.api_base_url}/{self.SIMPLE_ARTIST_API_ENDPOINT}"
         params = {}
 
         if id:
@@ -1150,26 +2750,32 @@ class TrackManager:
         if not params:
             raise ValueError("No parameters were provided to query.")
 
-        query_string = urlencode(params)
+        return f"{endpoint}?{urlencode(params)}"
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{endpoint}?{query_string}")
-            if response.status_code == 200:
-                response_json = response.json()
+    async def get_simple_artist(self, id: int, name: str) -> dict:
+        """
+        Gets details for a simple artist from the database
+        """
 
-                if response_json:
-                    return response_json
+        url = self.get_simple_artist_url(id, name)
 
-                return None
+        response = await self._request("GET", url, cached=True)
+        if response.status_code == 200:
+            response_json = response.json()
 
-    async def get_simple_artist_alias(
+            if response_json:
+                return response_json
+
+            return None
+
+    def get_simple_artist_alias_url(
         self, name: str = None, franchiseId: int = None
-    ) -> dict:
+    ) -> str:
         """
-        Gets all aliases of a simple artist from the db
+        Returns the url to query simple artist aliases by name, franchise or both
         """
 
-        endpoint = f"http://{self.api_host}:{self.api_port}/{self.SIMPLE_ARTIST_ALIAS_API_ENDPOINT}"
+        endpoint = f"{self.api_base_url}/{self.SIMPLE_ARTIST_ALIAS_API_ENDPOINT}"
         params = {}
 
         if name:
@@ -1180,26 +2786,63 @@ class TrackManager:
         if not params:
             raise ValueError("No parameters were provided to query.")
 
-        query_string = urlencode(params)
+        return f"{endpoint}?{urlencode(params)}"
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{endpoint}?{query_string}")
-            if response.status_code == 200:
-                response_json = response.json()
+    async def get_simple_artist_alias(
+        self, name: str = None, franchiseId: int = None
+    ) -> dict:
+        """
+        Gets all aliases of a simple artist from the db
+        """
 
-                if response_json:
-                    return response_json
+        url = self.get_simple_artist_alias_url(name, franchiseId)
 
-                return None
+        response = await self._request("GET", url, cached=True)
+        if response.status_code == 200:
+            response_json = response.json()
+
+            if response_json:
+                return response_json
+
+            return None
+
+    async def list_simple_artist_franchise_aliases(self, franchise_id: int) -> list:
+        """
+        Gets all aliases of a franchise from the db
+        """
+
+        endpoint = f"{self.api_base_url}/{self.SIMPLE_ARTIST_ALIAS_API_ENDPOINT}"
+        query_string = urlencode({"franchiseId": franchise_id})
+
+        response = await self._request("GET", f"{endpoint}?{query_string}", cached=True)
+
+        if response.status_code != 200:
+            raise Exception(
+                f"Failed to fetch aliases for franchise {franchise_id}: {response.status_code}"
+            )
+
+        return response.json() or []
+
+    def iter_simple_artist_franchise_aliases(
+        self, franchise_id: int
+    ) -> AsyncIterator[dict]:
+        """
+        Yields all aliases of a franchise from the db while they are being downloaded
+        """
+
+        endpoint = f"{self.api_base_url}/{self.SIMPLE_ARTIST_ALIAS_API_ENDPOINT}"
+        query_string = urlencode({"franchiseId": franchise_id})
+
+        return self.iter_json_list(
+            f"{endpoint}?{query_string}", f"aliases for franchise {franchise_id}"
+        )
 
     async def post_mbartist(self, artist: MbArtistDetails) -> None:
         """
         Creates a new mb artist in the db from an artist details object
         """
 
-        endpoint = (
-            f"http://{self.api_host}:{self.api_port}/{self.MBARTIST_API_ENDPOINT}"
-        )
+        endpoint = f"{self.api_base_url}/{self.MBARTIST_API_ENDPOINT}"
 
         data = {
             "MbId": artist.mbid,
@@ -1209,48 +2852,53 @@ class TrackManager:
             "Type": artist.type,  # Added type property
         }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(endpoint, json=data)
+        response = await self._request(
+            "POST",
+            endpoint,
+            json=data,
+            invalidates=self.get_mbartist_url(artist.mbid),
+        )
 
-            if response.is_success:
-                return
+        if response.is_success:
+            if self.known_mbids is not None:
+                self.known_mbids.add(artist.mbid)
+            return
 
-            match response.status_code:
-                case 409:
-                    raise Exception(
-                        f"Artist with MBID {artist.mbid} already exists in DB: {response.text} ({response.status_code} {response.reason_phrase})"
-                    )
-                case _:
-                    raise Exception(
-                        f"Failed to create artist with MBID {artist.mbid}: {response.text} ({response.status_code} {response.reason_phrase})"
-                    )
+        match response.status_code:
+            case 409:
+                raise Exception(
+                    f"Artist with MBID {artist.mbid} already exists in DB: {response.text} ({response.status_code} {response.reason_phrase})"
+                )
+            case _:
+                raise Exception(
+                    f"Failed to create artist with MBID {artist.mbid}: {response.text} ({response.status_code} {response.reason_phrase})"
+                )
 
     async def post_simple_artist(self, artist: SimpleArtistDetails) -> dict:
         """
         Creates a new simple artist in the db from an artist details object
         """
 
-        endpoint = (
-            f"http://{self.api_host}:{self.api_port}/{self.SIMPLE_ARTIST_API_ENDPOINT}"
-        )
+        endpoint = f"{self.api_base_url}/{self.SIMPLE_ARTIST_API_ENDPOINT}"
 
         data = {"Name": artist.custom_name}
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(endpoint, json=data)
+        response = await self._request(
+            "POST", endpoint, json=data, invalidates=endpoint
+        )
 
-            if response.is_success:
-                return response.json()
+        if response.is_success:
+            return response.json()
 
-            match response.status_code:
-                case 409:
-                    raise Exception(
-                        f"Failed to post artist data for MBID {artist.mbid}: {response.text} ({response.status_code} {response.reason_phrase})"
-                    )
-                case _:
-                    raise Exception(
-                        f"Failed to post artist data for MBID {artist.mbid}: {response.text} ({response.status_code} {response.reason_phrase})"
-                    )
+        match response.status_code:
+            case 409:
+                raise Exception(
+                    f"Failed to post artist data for MBID {artist.mbid}: {response.text} ({response.status_code} {response.reason_phrase})"
+                )
+            case _:
+                raise Exception(
+                    f"Failed to post artist data for MBID {artist.mbid}: {response.text} ({response.status_code} {response.reason_phrase})"
+                )
 
     async def post_simple_artist_alias(
         self, artist_id: int, name: str, franchise_id: int
@@ -1259,7 +2907,7 @@ class TrackManager:
         Creates a new alias for a simple artist in the db
         """
 
-        endpoint = f"http://{self.api_host}:{self.api_port}/{self.SIMPLE_ARTIST_ALIAS_API_ENDPOINT}"
+        endpoint = f"{self.api_base_url}/{self.SIMPLE_ARTIST_ALIAS_API_ENDPOINT}"
 
         data = {
             "Name": name.replace(" ", ""),
@@ -1267,52 +2915,52 @@ class TrackManager:
             "franchiseid": franchise_id,
         }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(endpoint, json=data)
+        response = await self._request(
+            "POST", endpoint, json=data, invalidates=endpoint
+        )
 
-            if response.is_success:
-                return
+        if response.is_success:
+            return
 
-            match response.status_code:
-                case 409:
-                    raise Exception(
-                        f"Alias with name {name} already exists in DB: {response.text} ({response.status_code} {response.reason_phrase})"
-                    )
-                case _:
-                    raise Exception(
-                        f"Failed to create alias for name {name}: {response.text} ({response.status_code} {response.reason_phrase})"
-                    )
+        match response.status_code:
+            case 409:
+                raise Exception(
+                    f"Alias with name {name} already exists in DB: {response.text} ({response.status_code} {response.reason_phrase})"
+                )
+            case _:
+                raise Exception(
+                    f"Failed to create alias for name {name}: {response.text} ({response.status_code} {response.reason_phrase})"
+                )
 
     async def delete_simple_artist_alias(self, id: int) -> None:
         """
         Deletes a simple artist alias
         """
 
-        async with httpx.AsyncClient() as client:
-            response = await client.delete(
-                f"http://{self.api_host}:{self.api_port}/{self.SIMPLE_ARTIST_ALIAS_API_ENDPOINT}/id/{id}"
-            )
+        endpoint = f"{self.api_base_url}/{self.SIMPLE_ARTIST_ALIAS_API_ENDPOINT}"
 
-            match response.status_code:
-                case 200:
-                    return
-                case 404:
-                    raise Exception(
-                        f"Alias with ID {id} was not found: {response.status_code}"
-                    )
-                case _:
-                    raise Exception(
-                        f"An error occurred when deleting alias with ID {id}: {response.status_code}"
-                    )
+        response = await self._request(
+            "DELETE", f"{endpoint}/id/{id}", invalidates=endpoint
+        )
+
+        match response.status_code:
+            case 200:
+                return
+            case 404:
+                raise Exception(
+                    f"Alias with ID {id} was not found: {response.status_code}"
+                )
+            case _:
+                raise Exception(
+                    f"An error occurred when deleting alias with ID {id}: {response.status_code}"
+                )
 
     async def update_mbartist(self, id: int, artist: MbArtistDetails) -> None:
         """
         Updates the db record of a mb artist
         """
 
-        endpoint = (
-            f"http://{self.api_host}:{self.api_port}/{self.MBARTIST_API_ENDPOINT}/id"
-        )
+        endpoint = f"{self.api_base_url}/{self.MBARTIST_API_ENDPOINT}/id"
 
         data = {
             "MbId": artist.mbid,
@@ -1322,60 +2970,295 @@ class TrackManager:
             "Type": artist.type,  # Added type property
         }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.put(f"{endpoint}/{id}", json=data)
+        response = await self._request(
+            "PUT",
+            f"{endpoint}/{id}",
+            json=data,
+            invalidates=self.get_mbartist_url(artist.mbid),
+        )
 
-            if response.is_success:
-                return response.json()
+        if response.is_success:
+            return response.json()
 
-            match response.status_code:
-                case 404:
-                    raise Exception(
-                        f"Could not find artist with MBID {artist.mbid}: {response.text} ({response.status_code} {response.reason_phrase})"
-                    )
-                case _:
-                    raise Exception(
-                        f"Failed to update artist data for MBID {artist.mbid}: {response.text} ({response.status_code} {response.reason_phrase})"
-                    )
+        match response.status_code:
+            case 404:
+                raise Exception(
+                    f"Could not find artist with MBID {artist.mbid}: {response.text} ({response.status_code} {response.reason_phrase})"
+                )
+            case _:
+                raise Exception(
+                    f"Failed to update artist data for MBID {artist.mbid}: {response.text} ({response.status_code} {response.reason_phrase})"
+                )
 
     async def update_simple_artist(self, id: int, artist: SimpleArtistDetails) -> None:
         """
         Updates the db record of a simple artist
         """
 
-        endpoint = f"http://{self.api_host}:{self.api_port}/{self.SIMPLE_ARTIST_API_ENDPOINT}/id"
+        endpoint = f"{self.api_base_url}/{self.SIMPLE_ARTIST_API_ENDPOINT}/id"
 
         data = {"Name": artist.custom_name}
 
-        async with httpx.AsyncClient() as client:
-            response = await client.put(f"{endpoint}/{id}", json=data)
+        response = await self._request(
+            "PUT",
+            f"{endpoint}/{id}",
+            json=data,
+            invalidates=f"{self.api_base_url}/{self.SIMPLE_ARTIST_API_ENDPOINT}",
+        )
+
+        if response.is_success:
+            return response.json()
+
+        match response.status_code:
+            case 404:
+                raise Exception(
+                    f"Could not find artist with MBID {artist.id}: {response.text} ({response.status_code} {response.reason_phrase})"
+                )
+            case _:
+                raise Exception(
+                    f"Failed to update artist data for MBID {artist.mbid}: {response.text} ({response.status_code} {response.reason_phrase})"
+                )
+
+    async def queue_update_mbartist(self, id: int, artist: MbArtistDetails) -> None:
+        """
+        Queues an update of a mb artist in the write queue, or sends it immediately if no queue is used.
+        The artist is read when the update is sent, so repeated updates only send the final state.
+        """
+
+        await self.queue_mutation(
+            ("mbartist", id), lambda: self.update_mbartist(id, artist)
+        )
+
+    async def queue_update_simple_artist(
+        self, id: int, artist: SimpleArtistDetails
+    ) -> None:
+        """
+        Queues an update of a simple artist in the write queue, or sends it immediately if no queue is used.
+        The artist is read when the update is sent, so repeated updates only send the final state.
+        """
+
+        await self.queue_mutation(
+            ("simple_artist", id), lambda: self.update_simple_artist(id, artist)
+        )
+
+    async def queue_post_simple_artist_alias(
+        self, artist_id: int, name: str, franchise_id: int
+    ) -> None:
+        """
+        Queues the creation of a simple artist alias in the write queue, or sends it immediately if no queue is used.
+        Only the last queued alias for the same name and franchise is created.
+        """
+
+        await self.queue_mutation(
+            ("alias", name.replace(" ", ""), franchise_id),
+            lambda: self.post_simple_artist_alias(artist_id, name, franchise_id),
+        )
+
+    async def queue_mutation(self, key: tuple, action) -> None:
+        """
+        Adds a mutation to the write queue, or sends it immediately if no queue is used
+        """
+
+        if self.write_queue is None:
+            await action()
+            return
+
+        self.write_queue.enqueue(key, action)
+
+    async def flush(self) -> dict[tuple, Optional[Exception]]:
+        """
+        Sends all mutations in the write queue.
+        Returns a dict mapping the key of every sent mutation to the raised exception, or None on success,
+        including mutations that failed in background flushes since the last call.
+        """
+
+        if self.write_queue is None:
+            return {}
+
+        return await self.write_queue.flush()
+
+    async def sync_changes_from_db(self) -> dict[str, int]:
+        """
+        Fetches everything that changed in the db since the last sync and applies it to the
+        local caches and indexes, so that only changes need to be downloaded on startup.
+        Returns a dict with the number of changed items per endpoint.
+        Sync cursors are kept in the persistent cache if one is used, so they survive restarts.
+        """
+
+        report = {}
+        for endpoint in self.DELTA_SYNC_ENDPOINTS:
+            report[endpoint] = await self.sync_endpoint_changes(endpoint)
+
+        return report
+
+    async def sync_endpoint_changes(self, endpoint: str) -> int:
+        """
+        Fetches and applies all changes of an endpoint since its last sync cursor.
+        Without a cursor, the cached responses of the endpoint are discarded since it is
+        unknown which of them are current, and the current cursor is stored as a starting point.
+        """
+
+        cursor = self.get_sync_cursor(endpoint)
+
+        if cursor is None:
+            self.invalidate_cached_responses(f"{self.api_base_url}/{endpoint}")
+            changes = await self.get_changes(endpoint, None)
+            self.set_sync_cursor(endpoint, changes["cursor"])
+            return 0
+
+        change_count = 0
+        while True:
+            changes = await self.get_changes(endpoint, cursor)
+            items = changes.get("items") or []
+            deleted = changes.get("deleted") or []
+
+            self.apply_changes(endpoint, items, deleted)
+            change_count += len(items) + len(deleted)
+
+            cursor = changes["cursor"]
+            self.set_sync_cursor(endpoint, cursor)
+
+            if not changes.get("hasMore"):
+                return change_count
+
+    async def get_changes(self, endpoint: str, cursor: Optional[str]) -> dict:
+        """
+        Gets the items of an endpoint that were changed or deleted after cursor.
+        Without a cursor, the db only returns its current cursor.
+        """
+
+        url = f"{self.api_base_url}/{endpoint}/changes"
+        if cursor is not None:
+            url = f"{url}?{urlencode({'since': cursor})}"
+
+        response = await self._request("GET", url)
+
+        if response.status_code != 200:
+            raise Exception(
+                f"Failed to fetch changes for {endpoint}: {response.status_code}"
+            )
+
+        return response.json()
+
+    def apply_changes(
+        self, endpoint: str, items: list[dict], deleted: list[dict]
+    ) -> None:
+        """
+        Updates the local caches and indexes with changed and deleted items of an endpoint.
+        Changed simple artists and aliases carry the name (previousName), and for aliases the
+        franchise (previousFranchiseId), they had before the change, or null for new items,
+        so that cached lookups by the previous values are discarded as well.
+        If the db doesn't report them, all cached responses of the endpoint are discarded.
+        """
+
+        if not items and not deleted:
+            return
+
+        match endpoint:
+            case self.MBARTIST_API_ENDPOINT:
+                for item in items + deleted:
+                    self.invalidate_cached_response(self.get_mbartist_url(item["mbid"]))
 
-            if response.is_success:
-                return response.json()
+                if self.known_mbids is not None:
+                    for item in items:
+                        self.known_mbids.add(item["mbid"])
 
-            match response.status_code:
-                case 404:
-                    raise Exception(
-                        f"Could not find artist with MBID {artist.id}: {response.text} ({response.status_code} {response.reason_phrase})"
+            case self.SIMPLE_ARTIST_API_ENDPOINT:
+                if any("previousName" not in item for item in items):
+                    # lookups by the old name of a renamed artist can't be found without it
+                    self.invalidate_cached_responses(f"{self.api_base_url}/{endpoint}")
+                    return
+
+                for item in items + deleted:
+                    self.invalidate_cached_response(
+                        self.get_simple_artist_url(item["id"], None)
                     )
-                case _:
-                    raise Exception(
-                        f"Failed to update artist data for MBID {artist.mbid}: {response.text} ({response.status_code} {response.reason_phrase})"
+
+                    for name in {item["name"], item.get("previousName")} - {None}:
+                        for id in (None, item["id"]):
+                            self.invalidate_cached_response(
+                                self.get_simple_artist_url(id, name)
+                            )
+
+            case self.SIMPLE_ARTIST_ALIAS_API_ENDPOINT:
+                if any(
+                    "previousName" not in item or "previousFranchiseId" not in item
+                    for item in items
+                ):
+                    # lookups by the old name or franchise of a moved alias can't be found without them
+                    self.invalidate_cached_responses(f"{self.api_base_url}/{endpoint}")
+                    return
+
+                for item in items + deleted:
+                    names = {item["name"], item.get("previousName")} - {None}
+                    franchise_ids = {
+                        item["franchiseId"],
+                        item.get("previousFranchiseId"),
+                    } - {None}
+
+                    for name in names:
+                        self.invalidate_cached_response(
+                            self.get_simple_artist_alias_url(name, None)
+                        )
+
+                    for franchise_id in franchise_ids:
+                        self.invalidate_cached_response(
+                            self.get_simple_artist_alias_url(None, franchise_id)
+                        )
+
+                        for name in names:
+                            self.invalidate_cached_response(
+                                self.get_simple_artist_alias_url(name, franchise_id)
+                            )
+
+            case self.SIMPLE_ARTIST_FRANCHISE_API_ENDPOINT:
+                if self.db_products is not None:
+                    changed_ids = {item["id"] for item in items + deleted}
+                    self.db_products = [
+                        product
+                        for product in self.db_products
+                        if product["id"] not in changed_ids
+                    ] + items
+                    self.db_product_index = SimpleArtistDetails.build_franchise_index(
+                        self.db_products
                     )
 
+                self.invalidate_cached_responses(f"{self.api_base_url}/{endpoint}")
+
+    def get_sync_cursor(self, endpoint: str) -> Optional[str]:
+        """
+        Returns the cursor of the last sync of an endpoint
+        """
+
+        if endpoint not in self.sync_cursors and self.persistent_cache is not None:
+            cursor = self.persistent_cache.get_metadata(f"sync_cursor:{endpoint}")
+            if cursor is not None:
+                self.sync_cursors[endpoint] = cursor
+
+        return self.sync_cursors.get(endpoint)
+
+    def set_sync_cursor(self, endpoint: str, cursor: str) -> None:
+        """
+        Stores the cursor of the last sync of an endpoint
+        """
+
+        self.sync_cursors[endpoint] = cursor
+
+        if self.persistent_cache is not None:
+            self.persistent_cache.set_metadata(f"sync_cursor:{endpoint}", cursor)
+
     async def get_server_health(self) -> bool:
         """
         Calls the health endpoint of the ai server
         """
 
-        endpoint = f"http://{self.api_host}:{self.api_port}/health"
-
-        async with httpx.AsyncClient(timeout=1) as client:
-            try:
-                response = await client.get(f"{endpoint}")
-                if response.status_code == 200:
-                    return True
-            except Exception:
-                return False
+        endpoint = f"{self.api_base_url}/health"
 
+        try:
+            response = await self._request("GET", f"{endpoint}", timeout=1)
+            if response.status_code == 200:
+                return True
+        except Exception:
             return False
+
+        return False
@@ -0,0 +1,686 @@
+import os
+import sqlite3
+import threading
+import pytest
+import httpx
+import respx
+from unittest.mock import AsyncMock
+from mutagen import id3
+from artist_resolver.cache import (
+    BloomFilter,
+    PersistentResponseCache,
+    ResponseCache,
+    TagCache,
+)
+from artist_resolver.trackmanager import TrackManager, MbArtistDetails, TrackDetails
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def create_mbartist(mbid: str) -> MbArtistDetails:
+    """
+    Returns a mb artist object with dummy values
+    """
+    return MbArtistDetails(
+        name="MbArtist",
+        type="Person",
+        disambiguation="",
+        sort_name="MbArtist",
+        id=mbid,
+        aliases=[],
+        type_id="b6e035f4-3ce9-331c-97df-83397230b0df",
+        joinphrase="",
+    )
+
+
+def test_response_cache_expires_entries():
+    # Arrange
+    clock = FakeClock()
+    cache = ResponseCache(max_size=10, ttl=60, clock=clock)
+
+    # Act
+    cache.set("key1", "value1")
+    cache.set("key2", "value2", ttl=120)
+    clock.now = 90
+
+    # Assert
+    assert cache.get("key1") is None, "Expected entry to expire after its ttl"
+    assert cache.get("key2") == "value2"
+    assert len(cache) == 1
+
+
+def test_response_cache_evicts_least_recently_used():
+    # Arrange
+    cache = ResponseCache(max_size=2, ttl=60)
+    cache.set("key1", "value1")
+    cache.set("key2", "value2")
+
+    # Act
+    cache.get("key1")
+    cache.set("key3", "value3")
+
+    # Assert
+    assert cache.get("key1") == "value1"
+    assert cache.get("key2") is None, "Expected least recently used entry to be evicted"
+    assert cache.get("key3") == "value3"
+
+
+def test_response_cache_invalidate_prefix():
+    # Arrange
+    cache = ResponseCache()
+    cache.set("http://host/api/artist?name=a", 1)
+    cache.set("http://host/api/artist?id=1", 2)
+    cache.set("http://host/api/alias?name=a", 3)
+
+    # Act
+    cache.invalidate("http://host/api/artist")
+
+    # Assert
+    assert len(cache) == 1
+    assert cache.get("http://host/api/alias?name=a") == 3
+
+
+@pytest.mark.asyncio
+@respx.mock(assert_all_mocked=True)
+async def test_cached_mbartist_lookup(respx_mock):
+    # Arrange
+    manager = TrackManager(response_cache=ResponseCache())
+    artist = create_mbartist("mock-mbid")
+
+    respx_mock.route(
+        method="GET",
+        port=manager.api_port,
+        host=manager.api_host,
+        path=f"/api/mbartist/mbid/{artist.mbid}",
+    ).mock(return_value=httpx.Response(200, json={"mbid": artist.mbid, "name": "Name"}))
+
+    respx_mock.route(
+        method="PUT",
+        port=manager.api_port,
+        host=manager.api_host,
+        path="/api/mbartist/id/1",
+    ).mock(return_value=httpx.Response(200, json={}))
+
+    # Act
+    first_result = await manager.get_mbartist(artist.mbid)
+    second_result = await manager.get_mbartist(artist.mbid)
+
+    # Assert
+    assert first_result == second_result
+    assert respx_mock.calls.call_count == 1, "Expected second lookup to be cached"
+
+    # updating the artist discards the cached lookup
+    await manager.update_mbartist(1, artist)
+    await manager.get_mbartist(artist.mbid)
+    assert respx_mock.calls.call_count == 3
+
+
+@pytest.mark.asyncio
+@respx.mock(assert_all_mocked=True)
+async def test_missing_items_are_not_response_cached(respx_mock):
+    # Arrange
+    manager = TrackManager(response_cache=ResponseCache())
+
+    respx_mock.route(
+        method="GET",
+        port=manager.api_port,
+        host=manager.api_host,
+        path__regex=r"/api/mbartist/mbid/.*",
+    ).mock(return_value=httpx.Response(404))
+
+    respx_mock.route(
+        method="GET",
+        port=manager.api_port,
+        host=manager.api_host,
+        path="/api/alias",
+    ).mock(return_value=httpx.Response(200, text="[]"))
+
+    # Act
+    for _ in range(2):
+        await manager.get_mbartist("mock-mbid")
+        await manager.get_simple_artist_alias("Artist", 1)
+
+    # Assert
+    assert respx_mock.calls.call_count == 4
+    assert len(manager.response_cache) == 0
+
+
+def test_persistent_cache_max_age(tmp_path):
+    # Arrange
+    clock = FakeClock()
+    cache = PersistentResponseCache(
+        str(tmp_path / "cache.db"), fresh_for=10, max_age=100, clock=clock
+    )
+    response = httpx.Response(200, json={"id": 1}, headers={"etag": '"v1"'})
+
+    # Act & Assert
+    cache.set("http://host/api/franchise", response)
+    assert cache.get("http://host/api/franchise")["fresh"] is True
+
+    clock.now = 50
+    entry = cache.get("http://host/api/franchise")
+    assert entry["fresh"] is False, "Expected entry to need revalidation"
+    assert entry["etag"] == '"v1"'
+
+    clock.now = 200
+    assert cache.get("http://host/api/franchise") is None
+    assert len(cache) == 0
+    cache.close()
+
+
+@pytest.mark.asyncio
+@respx.mock(assert_all_mocked=True)
+async def test_persistent_cache_survives_restart_and_revalidates(respx_mock, tmp_path):
+    # Arrange
+    clock = FakeClock()
+    cache_path = str(tmp_path / "cache.db")
+    mbid = "mock-mbid"
+
+    def mbartist_response(request):
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+
+        return httpx.Response(
+            200, json={"mbid": mbid, "name": "Name"}, headers={"etag": '"v1"'}
+        )
+
+    respx_mock.route(
+        method="GET",
+        port=TrackManager.API_PORT,
+        host=TrackManager.API_DOMAIN,
+        path=f"/api/mbartist/mbid/{mbid}",
+    ).mock(side_effect=mbartist_response)
+
+    first_cache = PersistentResponseCache(cache_path, fresh_for=60, clock=clock)
+    async with TrackManager(persistent_cache=first_cache) as manager:
+        await manager.get_mbartist(mbid)
+    first_cache.close()
+
+    # Act
+    second_cache = PersistentResponseCache(cache_path, fresh_for=60, clock=clock)
+    async with TrackManager(persistent_cache=second_cache) as manager:
+        fresh_result = await manager.get_mbartist(mbid)
+        calls_after_fresh_lookup = respx_mock.calls.call_count
+
+        clock.now = 120
+        revalidated_result = await manager.get_mbartist(mbid)
+
+    # Assert
+    assert fresh_result == {"mbid": mbid, "name": "Name"}
+    assert calls_after_fresh_lookup == 1, "Expected fresh entry to be served locally"
+    assert revalidated_result == fresh_result
+    assert respx_mock.calls.call_count == 2
+    assert respx_mock.calls[1].request.headers["If-None-Match"] == '"v1"'
+    assert second_cache.get(manager.get_mbartist_url(mbid))["fresh"] is True
+    second_cache.close()
+
+
+@pytest.mark.asyncio
+@respx.mock(assert_all_mocked=True)
+async def test_persistent_cache_keeps_negative_entries_across_restarts(
+    respx_mock, tmp_path
+):
+    # Arrange
+    clock = FakeClock()
+    cache_path = str(tmp_path / "cache.db")
+    loop_thread = threading.current_thread()
+    cache_threads = set()
+
+    respx_mock.route(
+        method="GET",
+        port=TrackManager.API_PORT,
+        host=TrackManager.API_DOMAIN,
+        path="/api/mbartist/mbid/missing-mbid",
+    ).mock(return_value=httpx.Response(404))
+
+    first_cache = PersistentResponseCache(
+        cache_path, negative_max_age=60, batch_size=100, clock=clock
+    )
+    async with TrackManager(persistent_cache=first_cache) as manager:
+        await manager.get_mbartist("missing-mbid")
+    first_cache.close()
+
+    # Act
+    second_cache = PersistentResponseCache(cache_path, negative_max_age=60, clock=clock)
+    get_entry = second_cache.get
+
+    def record_thread(url):
+        cache_threads.add(threading.current_thread())
+        return get_entry(url)
+
+    second_cache.get = record_thread
+
+    async with TrackManager(persistent_cache=second_cache) as manager:
+        cached_result = await manager.get_mbartist("missing-mbid")
+        calls_after_restart = respx_mock.calls.call_count
+
+        clock.now = 120
+        expired_result = await manager.get_mbartist("missing-mbid")
+
+    # Assert
+    assert cached_result is None
+    assert calls_after_restart == 1, "Expected negative entry to be served locally"
+    assert expired_result is None
+    assert respx_mock.calls.call_count == 2
+    assert cache_threads and loop_thread not in cache_threads
+    second_cache.close()
+
+
+def test_persistent_cache_commits_entries_in_batches(tmp_path):
+    # Arrange
+    path = str(tmp_path / "cache.db")
+    cache = PersistentResponseCache(path, batch_size=2)
+    response = httpx.Response(200, json={"id": 1})
+
+    def committed_count() -> int:
+        with sqlite3.connect(path) as connection:
+            return connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    # Act & Assert
+    cache.set("http://host/api/artist?id=1", response)
+    assert committed_count() == 0, "Expected entry to wait for the batch"
+
+    cache.set("http://host/api/artist?id=2", response)
+    assert committed_count() == 2
+
+    cache.set("http://host/api/artist?id=3", response)
+    cache.commit()
+    assert committed_count() == 3
+
+    cache.set("http://host/api/artist?id=4", response)
+    cache.close()
+    assert committed_count() == 4
+
+
+@pytest.mark.asyncio
+@respx.mock(assert_all_mocked=True)
+async def test_persistent_cache_invalidated_by_post(respx_mock, tmp_path):
+    # Arrange
+    cache = PersistentResponseCache(str(tmp_path / "cache.db"))
+    manager = TrackManager(persistent_cache=cache)
+    artist = create_mbartist("mock-mbid")
+    cache.set(
+        manager.get_mbartist_url(artist.mbid),
+        httpx.Response(200, json={"mbid": artist.mbid}),
+    )
+
+    respx_mock.route(
+        method="POST",
+        port=manager.api_port,
+        host=manager.api_host,
+        path="/api/mbartist",
+    ).mock(return_value=httpx.Response(200, json={}))
+
+    # Act
+    await manager.post_mbartist(artist)
+
+    # Assert
+    assert cache.get(manager.get_mbartist_url(artist.mbid)) is None
+    cache.close()
+
+
+@pytest.mark.asyncio
+@respx.mock(assert_all_mocked=True)
+async def test_negative_cache_for_missing_items(respx_mock):
+    # Arrange
+    manager = TrackManager(negative_cache=ResponseCache(ttl=30))
+    artist = create_mbartist("mock-mbid")
+
+    respx_mock.route(
+        method="GET",
+        port=manager.api_port,
+        host=manager.api_host,
+        path=f"/api/mbartist/mbid/{artist.mbid}",
+    ).mock(return_value=httpx.Response(404))
+
+    respx_mock.route(
+        method="GET",
+        port=manager.api_port,
+        host=manager.api_host,
+        path="/api/alias",
+    ).mock(return_value=httpx.Response(200, text="[]"))
+
+    respx_mock.route(
+        method="POST",
+        port=manager.api_port,
+        host=manager.api_host,
+        path="/api/mbartist",
+    ).mock(return_value=httpx.Response(200, json={}))
+
+    respx_mock.route(
+        method="POST",
+        port=manager.api_port,
+        host=manager.api_host,
+        path="/api/alias",
+    ).mock(return_value=httpx.Response(200, json={}))
+
+    # Act
+    for _ in range(3):
+        assert await manager.get_mbartist(artist.mbid) is None
+        assert await manager.get_simple_artist_alias("Artist", 1) is None
+
+    # Assert
+    assert respx_mock.calls.call_count == 2, "Expected misses to be cached"
+
+    # creating the missing items discards the cached misses
+    await manager.post_mbartist(artist)
+    await manager.post_simple_artist_alias(1, "Artist", 1)
+    await manager.get_mbartist(artist.mbid)
+    await manager.get_simple_artist_alias("Artist", 1)
+    assert respx_mock.calls.call_count == 6
+
+
+def test_bloom_filter_membership():
+    # Arrange
+    items = [f"mbid-{i}" for i in range(1000)]
+
+    # Act
+    bloom_filter = BloomFilter.from_items(items, error_rate=0.01)
+
+    # Assert
+    assert all(item in bloom_filter for item in items), "Expected no false negatives"
+    false_positives = sum(f"unknown-{i}" in bloom_filter for i in range(1000))
+    assert false_positives < 50
+
+
+@pytest.mark.asyncio
+@respx.mock(assert_all_mocked=True)
+async def test_known_mbids_skip_lookup_for_unknown_artists(respx_mock):
+    # Arrange
+    manager = TrackManager()
+    manager.set_known_mbids(["known-mbid"])
+    artist = create_mbartist("new-mbid")
+
+    respx_mock.route(
+        method="GET",
+        port=manager.api_port,
+        host=manager.api_host,
+        path__regex=r"/api/mbartist/mbid/.*",
+    ).mock(return_value=httpx.Response(200, json={"name": "Name"}))
+
+    respx_mock.route(
+        method="POST",
+        port=manager.api_port,
+        host=manager.api_host,
+        path="/api/mbartist",
+    ).mock(return_value=httpx.Response(200, json={}))
+
+    # Act
+    unknown_result = await manager.get_mbartist(artist.mbid)
+    known_result = await manager.get_mbartist("known-mbid")
+
+    # Assert
+    assert unknown_result is None
+    assert known_result == {"name": "Name"}
+    assert respx_mock.calls.call_count == 1
+
+    # posted artists become known
+    await manager.post_mbartist(artist)
+    assert await manager.get_mbartist(artist.mbid) == {"name": "Name"}
+
+
+def mock_changes_server(respx_mock, changes: dict) -> None:
+    """
+    Mocks the changes endpoints of a server. Requests without a cursor return cursor 1,
+    requests for cursor 1 return the provided changes per endpoint with cursor 2.
+    """
+
+    def changes_response(request):
+        endpoint = request.url.path.removeprefix("/").removesuffix("/changes")
+        if "since" not in request.url.params:
+            return httpx.Response(200, json={"cursor": "1", "items": []})
+
+        assert request.url.params["since"] == "1"
+        return httpx.Response(
+            200,
+            json={"cursor": "2", "items": [], "deleted": [], **changes[endpoint]},
+        )
+
+    respx_mock.route(
+        method="GET",
+        port=TrackManager.API_PORT,
+        host=TrackManager.API_DOMAIN,
+        path__regex=r"/api/\w+/changes",
+    ).mock(side_effect=changes_response)
+
+
+@pytest.mark.asyncio
+@respx.mock(assert_all_mocked=True)
+async def test_delta_sync_applies_changes_since_last_run(respx_mock, tmp_path):
+    # Arrange
+    cache = PersistentResponseCache(str(tmp_path / "cache.db"))
+    mock_changes_server(
+        respx_mock,
+        {
+            "api/mbartist": {"items": [{"id": 1, "mbid": "changed-mbid"}]},
+            "api/artist": {
+                "items": [{"id": 1, "name": "Renamed", "previousName": "Original"}],
+                "deleted": [{"id": 2, "name": "Deleted"}],
+            },
+            "api/alias": {
+                "items": [
+                    {
+                        "id": 5,
+                        "name": "Alias",
+                        "artistId": 1,
+                        "franchiseId": 3,
+                        "previousName": "Alias",
+                        "previousFranchiseId": 4,
+                    }
+                ]
+            },
+            "api/franchise": {"items": [{"id": 2, "name": "NewFranchise"}]},
+        },
+    )
+
+    async with TrackManager(persistent_cache=cache) as manager:
+        first_report = await manager.sync_changes_from_db()
+
+    manager = TrackManager(persistent_cache=cache)
+    cache.set(
+        manager.get_mbartist_url("changed-mbid"),
+        httpx.Response(200, json={"mbid": "changed-mbid"}),
+    )
+    cache.set(
+        manager.get_mbartist_url("unchanged-mbid"),
+        httpx.Response(200, json={"mbid": "unchanged-mbid"}),
+    )
+    changed_urls = [
+        manager.get_simple_artist_url(1, None),
+        manager.get_simple_artist_url(None, "Renamed"),
+        manager.get_simple_artist_url(1, "Renamed"),
+        manager.get_simple_artist_url(None, "Original"),
+        manager.get_simple_artist_url(2, None),
+        manager.get_simple_artist_url(None, "Deleted"),
+        manager.get_simple_artist_alias_url("Alias", None),
+        manager.get_simple_artist_alias_url(None, 3),
+        manager.get_simple_artist_alias_url("Alias", 3),
+        manager.get_simple_artist_alias_url(None, 4),
+        manager.get_simple_artist_alias_url("Alias", 4),
+    ]
+    unchanged_urls = [
+        manager.get_simple_artist_url(10, None),
+        manager.get_simple_artist_url(None, "Other"),
+        manager.get_simple_artist_alias_url(None, 30),
+        manager.get_simple_artist_alias_url("Other", 3),
+    ]
+    for url in changed_urls + unchanged_urls:
+        cache.set(url, httpx.Response(200, json=[{"id": 1}]))
+    manager.db_products = [{"id": 1, "name": "_"}]
+
+    # Act
+    second_report = await manager.sync_changes_from_db()
+    await manager.aclose()
+
+    # Assert
+    assert all(count == 0 for count in first_report.values())
+    assert second_report == {
+        "api/mbartist": 1,
+        "api/artist": 2,
+        "api/alias": 1,
+        "api/franchise": 1,
+    }
+    assert respx_mock.calls.call_count == 8
+    assert cache.get(manager.get_mbartist_url("changed-mbid")) is None
+    assert cache.get(manager.get_mbartist_url("unchanged-mbid")) is not None
+    assert all(cache.get(url) is None for url in changed_urls)
+    assert all(cache.get(url) is not None for url in unchanged_urls)
+    assert "NewFranchise" in manager.db_product_index
+    assert cache.get_metadata("sync_cursor:api/franchise") == "2"
+    cache.close()
+
+
+@pytest.mark.parametrize(
+    "endpoint, item",
+    [
+        ("api/artist", {"id": 1, "name": "Renamed"}),
+        ("api/alias", {"id": 5, "name": "Alias", "artistId": 1, "franchiseId": 3}),
+    ],
+)
+def test_apply_changes_without_previous_values_discards_endpoint(
+    tmp_path, endpoint, item
+):
+    # Arrange
+    cache = PersistentResponseCache(str(tmp_path / "cache.db"))
+    manager = TrackManager(persistent_cache=cache)
+    endpoint_url = f"{manager.api_base_url}/{endpoint}?name=Other"
+    cache.set(endpoint_url, httpx.Response(200, json=[{"id": 2}]))
+
+    # Act
+    manager.apply_changes(endpoint, [item], [])
+
+    # Assert
+    assert cache.get(endpoint_url) is None
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_tag_cache_skips_unchanged_files(mocker, tmp_path):
+    # Arrange
+    file_path = str(tmp_path / "track.mp3")
+    file_id3 = id3.ID3()
+    file_id3.add(id3.TIT2(encoding=3, text="Title"))
+    file_id3.add(id3.TPE1(encoding=3, text=["Artist1", "Artist2"]))
+    file_id3.save(file_path)
+
+    tag_cache = TagCache(str(tmp_path / "tags.db"))
+    mocker.patch.object(TrackDetails, "create_artist_objects", new_callable=AsyncMock)
+    read_id3 = mocker.spy(TrackDetails, "get_id3_object")
+
+    async with TrackManager(tag_cache=tag_cache) as manager:
+        await manager.load_files([file_path])
+
+    # Act
+    async with TrackManager(tag_cache=tag_cache) as manager:
+        await manager.load_files([file_path])
+        cached_track = manager.tracks[0]
+        calls_after_cached_load = read_id3.call_count
+
+        cached_track.title = "New Title"
+        await manager.save_files()
+
+    async with TrackManager(tag_cache=tag_cache) as manager:
+        await manager.load_files([file_path])
+        saved_track = manager.tracks[0]
+
+    # Assert
+    assert calls_after_cached_load == 1, "Expected unchanged file not to be opened"
+    assert cached_track.artist == ["Artist1", "Artist2"]
+    assert saved_track.title == "New Title"
+    assert read_id3.call_count == 1, "Expected saved file to be loaded from the cache"
+    assert id3.ID3(file_path)["TIT2"].text == ["New Title"]
+    assert len(tag_cache) == 1
+    tag_cache.close()
+
+
+def test_tag_cache_commits_entries_in_batches(tmp_path):
+    # Arrange
+    path = str(tmp_path / "tags.db")
+    tag_cache = TagCache(path, batch_size=2)
+    stat = os.stat(path)
+
+    def committed_count() -> int:
+        with sqlite3.connect(path) as connection:
+            return connection.execute("SELECT COUNT(*) FROM tags").fetchone()[0]
+
+    # Act & Assert
+    tag_cache.set("track1.mp3", stat, {"title": "1"})
+    assert committed_count() == 0, "Expected entry to wait for the batch"
+
+    tag_cache.set("track2.mp3", stat, {"title": "2"})
+    assert committed_count() == 2
+
+    tag_cache.set("track3.mp3", stat, {"title": "3"})
+    tag_cache.commit()
+    assert committed_count() == 3
+
+    tag_cache.set("track4.mp3", stat, {"title": "4"})
+    tag_cache.close()
+    assert committed_count() == 4
+
+
+@pytest.mark.asyncio
+async def test_tag_cache_is_used_off_the_event_loop(mocker, tmp_path):
+    # Arrange
+    file_paths = []
+    for i in range(3):
+        file_path = str(tmp_path / f"track{i}.mp3")
+        file_id3 = id3.ID3()
+        file_id3.add(id3.TIT2(encoding=3, text=f"Title {i}"))
+        file_id3.save(file_path)
+        file_paths.append(file_path)
+
+    path = str(tmp_path / "tags.db")
+    tag_cache = TagCache(path)
+    mocker.patch.object(TrackDetails, "create_artist_objects", new_callable=AsyncMock)
+    loop_thread = threading.current_thread()
+    cache_threads = set()
+
+    for name in ["get", "set"]:
+        method = getattr(tag_cache, name)
+
+        def record_thread(*args, method=method):
+            cache_threads.add(threading.current_thread())
+            return method(*args)
+
+        mocker.patch.object(tag_cache, name, side_effect=record_thread)
+
+    # Act
+    async with TrackManager(tag_cache=tag_cache) as manager:
+        await manager.load_files(file_paths)
+
+    # Assert
+    assert tag_cache.get.call_count == 3
+    assert tag_cache.set.call_count == 3
+    assert cache_threads and loop_thread not in cache_threads
+    with sqlite3.connect(path) as connection:
+        assert connection.execute("SELECT COUNT(*) FROM tags").fetchone()[0] == 3
+    tag_cache.close()
+
+
+def test_persistent_cache_opens_database_without_negative_columns(tmp_path):
+    # Arrange
+    path = str(tmp_path / "cache.db")
+    with sqlite3.connect(path) as connection:
+        connection.execute(
+            "CREATE TABLE responses (url TEXT PRIMARY KEY, content BLOB NOT NULL, "
+            "content_type TEXT, etag TEXT, stored_at REAL NOT NULL)"
+        )
+        connection.execute(
+            "INSERT INTO responses VALUES ('http://host/api/franchise', '[]', NULL, NULL, 0)"
+        )
+
+    # Act
+    cache = PersistentResponseCache(path, clock=FakeClock())
+    entry = cache.get("http://host/api/franchise")
+
+    # Assert
+    assert entry["status"] == 200
+    assert entry["negative"] is False
+    cache.close()
@@ -0,0 +1,144 @@
+import asyncio
+import pytest
+import httpx
+import respx
+from artist_resolver.limiter import AdaptiveLimiter
+from artist_resolver.trackmanager import TrackManager
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.asyncio
+async def test_limiter_grows_while_latency_is_flat():
+    # Arrange
+    limiter = AdaptiveLimiter(initial_limit=2, max_limit=4, clock=FakeClock())
+
+    # Act
+    for _ in range(20):
+        await limiter.acquire()
+        limiter.release(0.1, overloaded=False)
+
+    # Assert
+    assert limiter.stats["limit"] == 4
+    assert limiter.stats["min_latency"] == 0.1
+    assert limiter.stats["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_limiter_backs_off_on_rising_latency_and_overload():
+    # Arrange
+    clock = FakeClock()
+    limiter = AdaptiveLimiter(initial_limit=8, clock=clock)
+    await limiter.acquire()
+    limiter.release(0.1, overloaded=False)
+
+    # Act & Assert
+    await limiter.acquire()
+    limiter.release(2.0, overloaded=False)
+    assert limiter.stats["limit"] == 4, "Expected rising latency to halve the limit"
+
+    await limiter.acquire()
+    limiter.release(None, overloaded=True)
+    assert limiter.stats["limit"] == 4, "Expected one backoff per round trip"
+
+    clock.now = 10
+    await limiter.acquire()
+    limiter.release(None, overloaded=True)
+    assert limiter.stats["limit"] == 2
+
+
+@pytest.mark.asyncio
+@respx.mock(assert_all_mocked=True)
+async def test_requests_stay_within_adaptive_limit(respx_mock):
+    # Arrange
+    limiter = AdaptiveLimiter(initial_limit=2)
+    manager = TrackManager(limiter=limiter)
+    in_flight = 0
+    max_in_flight = 0
+
+    async def slow_response(request):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return httpx.Response(503)
+
+    respx_mock.route(
+        method="GET",
+        port=manager.api_port,
+        host=manager.api_host,
+        path__regex=r"/api/mbartist/mbid/.*",
+    ).mock(side_effect=slow_response)
+
+    # Act
+    results = await asyncio.gather(
+        *(manager.get_mbartist(f"mbid-{i}") for i in range(6)),
+        return_exceptions=True,
+    )
+
+    # Assert
+    assert all(isinstance(result, Exception) for result in results)
+    assert max_in_flight == 2
+    assert limiter.stats["limit"] == 1, "Expected 5xx responses to reduce the limit"
+
+
+@pytest.mark.asyncio
+@respx.mock(assert_all_mocked=True)
+async def test_streamed_lists_stay_within_adaptive_limit(respx_mock):
+    # Arrange
+    limiter = AdaptiveLimiter(initial_limit=2, max_limit=2)
+    manager = TrackManager(limiter=limiter)
+    url = f"{manager.api_base_url}/{manager.SIMPLE_ARTIST_FRANCHISE_API_ENDPOINT}"
+
+    respx_mock.route(
+        method="GET",
+        port=manager.api_port,
+        host=manager.api_host,
+        path="/api/franchise",
+    ).mock(
+        side_effect=[
+            httpx.Response(200, json=[{"id": 1}, {"id": 2}]),
+            httpx.Response(503),
+        ]
+    )
+
+    # Act
+    in_flight = [
+        limiter.stats["in_flight"]
+        async for _ in manager.iter_json_list(url, "franchises")
+    ]
+
+    with pytest.raises(Exception, match="503"):
+        async for _ in manager.iter_json_list(url, "franchises"):
+            pass
+
+    # Assert
+    assert in_flight == [1, 1], "Expected the slot to be held while items arrive"
+    assert limiter.stats["in_flight"] == 0
+    assert limiter.stats["limit"] == 1, "Expected 5xx responses to reduce the limit"
+
+
+@pytest.mark.asyncio
+async def test_limiter_recovers_after_fast_outlier():
+    # Arrange
+    clock = FakeClock()
+    limiter = AdaptiveLimiter(initial_limit=8, max_limit=8, clock=clock)
+    await limiter.acquire()
+    limiter.release(0.005, overloaded=False)
+
+    # Act
+    for _ in range(2000):
+        clock.now += 0.03
+        await limiter.acquire()
+        limiter.release(0.03, overloaded=False)
+
+    # Assert
+    assert limiter.stats["min_latency"] == 0.03
+    assert limiter.stats["limit"] == 8, "Expected the limit to recover"
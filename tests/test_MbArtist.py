@@ -1,3 +1,4 @@
+import asyncio
 import pytest
 import httpx
 import respx
@@ -1332,3 +1333,136 @@ async def test_read_file_metadata_read_artist_json_true_creates_simple_artist(
         isinstance(artist, SimpleArtistDetails)
         for artist in simpleartist_track.artist_details
     )
+
+
+@pytest.mark.asyncio
+@respx.mock(assert_all_mocked=True)
+async def test_update_artists_info_from_db_concurrent(respx_mock):
+    # Arrange
+    manager = TrackManager()
+    max_concurrency = 3
+    in_flight = 0
+    max_in_flight = 0
+
+    for i in range(10):
+        artist = MbArtistDetails(
+            name=f"Artist{i}",
+            type="Person",
+            disambiguation="",
+            sort_name=f"Artist{i}",
+            id=f"mock-artist{i}-id",
+            aliases=[],
+            type_id="b6e035f4-3ce9-331c-97df-83397230b0df",
+            joinphrase="",
+        )
+        manager.artist_data[artist.mbid] = artist
+
+    async def mbartist_response(request):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+
+        if request.url.path.endswith("mock-artist3-id"):
+            return httpx.Response(500)
+
+        return httpx.Response(404)
+
+    respx_mock.route(
+        method="GET",
+        port=manager.api_port,
+        host=manager.api_host,
+        path__regex=r"/api/mbartist/mbid/.*",
+    ).mock(side_effect=mbartist_response)
+
+    # Act
+    result = await manager.update_artists_info_from_db(max_concurrency=max_concurrency)
+
+    # Assert
+    assert respx_mock.calls.call_count == 10
+    assert max_in_flight == max_concurrency, (
+        f"Expected at most {max_concurrency} requests in flight, got {max_in_flight}"
+    )
+    assert len(result) == 10
+    assert isinstance(result["mock-artist3-id"], Exception)
+    assert all(
+        error is None for mbid, error in result.items() if mbid != "mock-artist3-id"
+    )
+
+    # the failed artist is not marked as updated so it is retried on the next refresh
+    assert not manager.artist_data["mock-artist3-id"].updated_from_server
+    assert all(
+        artist.updated_from_server
+        for artist in manager.artist_data.values()
+        if artist.mbid != "mock-artist3-id"
+    )
+
+
+@pytest.mark.asyncio
+@respx.mock(assert_all_mocked=True)
+async def test_send_changes_to_db_skips_clean_artists(respx_mock):
+    # Arrange
+    manager = TrackManager()
+    server_data = {}
+
+    for i in range(3):
+        artist = MbArtistDetails(
+            name=f"Artist{i}",
+            type="Person",
+            disambiguation="",
+            sort_name=f"Artist{i}",
+            id=f"mock-artist{i}-id",
+            aliases=[],
+            type_id="b6e035f4-3ce9-331c-97df-83397230b0df",
+            joinphrase="",
+        )
+        server_data[artist.mbid] = {
+            "id": i,
+            "mbid": artist.mbid,
+            "name": f"Custom Artist{i}",
+            "originalName": f"Artist{i}",
+            "type": "Person",
+            "include": True,
+        }
+        artist.update_from_customization(server_data[artist.mbid])
+        manager.artist_data[artist.mbid] = artist
+
+    edited_artist = manager.artist_data["mock-artist1-id"]
+    edited_artist.custom_name = "Edited Artist1"
+
+    respx_mock.route(
+        method="GET",
+        port=manager.api_port,
+        host=manager.api_host,
+        path__regex=r"/api/mbartist/mbid/.*",
+    ).mock(
+        side_effect=lambda request: httpx.Response(
+            200, json=server_data[request.url.path.split("/")[-1]]
+        )
+    )
+
+    respx_mock.route(
+        method="PUT",
+        port=manager.api_port,
+        host=manager.api_host,
+        path="/api/mbartist/id/1",
+    ).mock(return_value=httpx.Response(200, json={}))
+
+    # Act & Assert
+    assert edited_artist.dirty_properties == ["custom_name"]
+    assert not manager.artist_data["mock-artist0-id"].is_dirty
+
+    result = await manager.send_changes_to_db()
+    assert list(result) == [edited_artist.mbid], "Expected only edited artist to sync"
+    assert [c.request.method for c in respx_mock.calls] == ["GET", "PUT"]
+    assert not edited_artist.is_dirty, "Expected artist to be clean after sync"
+
+    await manager.send_changes_to_db()
+    assert respx_mock.calls.call_count == 2
+
+    # strict mode verifies all artists against the db
+    server_data[edited_artist.mbid]["name"] = edited_artist.custom_name
+    result = await manager.send_changes_to_db(strict=True)
+    assert len(result) == 3
+    assert respx_mock.calls.call_count == 5
@@ -0,0 +1,367 @@
+import asyncio
+import pytest
+import httpx
+import respx
+import json
+from artist_resolver.sync import SyncOperation, WriteBehindQueue, WriteQueueError
+from artist_resolver.trackmanager import (
+    TrackManager,
+    MbArtistDetails,
+    SimpleArtistDetails,
+)
+
+
+def create_mbartist(mbid: str) -> MbArtistDetails:
+    """
+    Returns a mb artist object with dummy values
+    """
+    return MbArtistDetails(
+        name=mbid,
+        type="Person",
+        disambiguation="",
+        sort_name=mbid,
+        id=mbid,
+        aliases=[],
+        type_id="b6e035f4-3ce9-331c-97df-83397230b0df",
+        joinphrase="",
+    )
+
+
+def create_simple_artist(name: str, product_id: int) -> SimpleArtistDetails:
+    """
+    Returns a simple artist object with dummy values
+    """
+    return SimpleArtistDetails(
+        name=name,
+        type="Person",
+        disambiguation="",
+        sort_name=name,
+        id=None,
+        aliases=[],
+        type_id="b6e035f4-3ce9-331c-97df-83397230b0df",
+        joinphrase="",
+        product="_",
+        product_id=product_id,
+    )
+
+
+def mock_server(respx_mock, manager: TrackManager) -> None:
+    """
+    Mocks a server that knows the artist 'changed-mbid', the simple artist 'ExistingArtist'
+    and an alias for 'ExistingArtist' that points to a different artist
+    """
+
+    def mbartist_response(request):
+        if request.url.path.endswith("changed-mbid"):
+            return httpx.Response(
+                200,
+                json={
+                    "id": 7,
+                    "include": True,
+                    "name": "Old name",
+                    "originalName": "changed-mbid",
+                },
+            )
+        return httpx.Response(404)
+
+    def simple_artist_response(request):
+        if request.url.params.get("name") == "ExistingArtist":
+            return httpx.Response(200, json=[{"id": 1, "name": "ExistingArtist"}])
+        return httpx.Response(200, text="[]")
+
+    def alias_response(request):
+        if request.url.params.get("name") == "ExistingArtist":
+            return httpx.Response(
+                200, json=[{"id": 50, "name": "ExistingArtist", "artistId": 99}]
+            )
+        return httpx.Response(200, text="[]")
+
+    respx_mock.route(
+        method="GET",
+        port=manager.api_port,
+        host=manager.api_host,
+        path__regex=r"/api/mbartist/mbid/.*",
+    ).mock(side_effect=mbartist_response)
+    respx_mock.route(
+        method="GET", port=manager.api_port, host=manager.api_host, path="/api/artist"
+    ).mock(side_effect=simple_artist_response)
+    respx_mock.route(
+        method="GET", port=manager.api_port, host=manager.api_host, path="/api/alias"
+    ).mock(side_effect=alias_response)
+    respx_mock.route(
+        method="POST",
+        port=manager.api_port,
+        host=manager.api_host,
+        path="/api/mbartist",
+    ).mock(return_value=httpx.Response(200, json={}))
+    respx_mock.route(
+        method="PUT",
+        port=manager.api_port,
+        host=manager.api_host,
+        path="/api/mbartist/id/7",
+    ).mock(return_value=httpx.Response(200, json={}))
+    respx_mock.route(
+        method="POST", port=manager.api_port, host=manager.api_host, path="/api/artist"
+    ).mock(return_value=httpx.Response(200, json={"id": 2, "name": "NewArtist"}))
+    respx_mock.route(
+        method="DELETE",
+        port=manager.api_port,
+        host=manager.api_host,
+        path="/api/alias/id/50",
+    ).mock(return_value=httpx.Response(200))
+    respx_mock.route(
+        method="POST", port=manager.api_port, host=manager.api_host, path="/api/alias"
+    ).mock(return_value=httpx.Response(200, json={}))
+
+
+def populate_artists(manager: TrackManager) -> None:
+    """
+    Adds one artist for every kind of change to the artist_data list of the manager
+    """
+    changed_artist = create_mbartist("changed-mbid")
+    changed_artist.custom_name = "New name"
+
+    for artist in [
+        create_mbartist("new-mbid"),
+        changed_artist,
+        create_simple_artist("NewArtist", 1),
+        create_simple_artist("NewArtist", 2),
+        create_simple_artist("ExistingArtist", 1),
+    ]:
+        manager.artist_data[artist.mbid] = artist
+
+
+@pytest.mark.asyncio
+@respx.mock(assert_all_mocked=True, assert_all_called=False)
+async def test_plan_changes_is_dry_run(respx_mock):
+    # Arrange
+    manager = TrackManager()
+    mock_server(respx_mock, manager)
+    populate_artists(manager)
+
+    # Act
+    plan = await manager.plan_changes(max_concurrency=4)
+
+    # Assert
+    assert all(c.request.method == "GET" for c in respx_mock.calls), (
+        "Expected planning to only send read requests"
+    )
+    assert sorted(op.action for op in plan.creates) == [
+        SyncOperation.CREATE_MBARTIST,
+        SyncOperation.CREATE_SIMPLE_ARTIST,
+        SyncOperation.CREATE_SIMPLE_ARTIST,
+    ]
+    assert [op.target_id for op in plan.updates] == [7]
+    assert [op.target_id for op in plan.alias_deletes] == [50]
+    assert len(plan.alias_creates) == 3
+    assert plan.errors == {}
+    assert all(artist.is_dirty for artist in manager.artist_data.values())
+
+
+@pytest.mark.asyncio
+@respx.mock(assert_all_mocked=True, assert_all_called=False)
+async def test_execute_plan(respx_mock):
+    # Arrange
+    manager = TrackManager()
+    mock_server(respx_mock, manager)
+    populate_artists(manager)
+    plan = await manager.plan_changes()
+    planning_calls = respx_mock.calls.call_count
+
+    # Act
+    result = await manager.execute_plan(plan, max_concurrency=4)
+
+    # Assert
+    assert all(error is None for error in result.values())
+    assert len(result) == 5
+
+    calls = [
+        (c.request.method, c.request.url.path)
+        for c in list(respx_mock.calls)[planning_calls:]
+    ]
+    assert calls.count(("POST", "/api/artist")) == 1, (
+        "Expected simple artists with the same name to be created once"
+    )
+    alias_calls = [i for i, c in enumerate(calls) if c[1].startswith("/api/alias")]
+    artist_calls = [i for i, c in enumerate(calls) if not c[1].startswith("/api/alias")]
+    assert max(artist_calls) < min(alias_calls), (
+        "Expected artists to be sent before aliases"
+    )
+    assert calls.index(("DELETE", "/api/alias/id/50")) < calls.index(
+        ("POST", "/api/alias")
+    )
+
+    posted_aliases = [
+        json.loads(c.request.content.decode())
+        for c in respx_mock.calls
+        if c.request.method == "POST" and c.request.url.path == "/api/alias"
+    ]
+    assert sorted(alias["artistid"] for alias in posted_aliases) == [1, 2, 2]
+    assert not any(artist.is_dirty for artist in manager.artist_data.values())
+
+
+@pytest.mark.asyncio
+@respx.mock(assert_all_mocked=True)
+async def test_execute_plan_skips_aliases_of_failed_artists(respx_mock):
+    # Arrange
+    manager = TrackManager()
+    artist = create_simple_artist("NewArtist", 1)
+    manager.artist_data[artist.mbid] = artist
+
+    respx_mock.route(
+        method="GET", port=manager.api_port, host=manager.api_host, path="/api/artist"
+    ).mock(return_value=httpx.Response(200, text="[]"))
+    respx_mock.route(
+        method="GET", port=manager.api_port, host=manager.api_host, path="/api/alias"
+    ).mock(return_value=httpx.Response(200, text="[]"))
+    respx_mock.route(
+        method="POST", port=manager.api_port, host=manager.api_host, path="/api/artist"
+    ).mock(return_value=httpx.Response(500))
+
+    # Act
+    plan = await manager.plan_changes()
+    result = await manager.execute_plan(plan)
+
+    # Assert
+    assert isinstance(result[artist.mbid], Exception)
+    assert respx_mock.calls.call_count == 3
+    assert artist.is_dirty
+
+
+@pytest.mark.asyncio
+@respx.mock(assert_all_mocked=True)
+async def test_write_queue_coalesces_updates(respx_mock):
+    # Arrange
+    manager = TrackManager(write_queue=WriteBehindQueue(max_delay=60))
+    artist = create_mbartist("changed-mbid")
+
+    update_route = respx_mock.route(
+        method="PUT",
+        port=manager.api_port,
+        host=manager.api_host,
+        path="/api/mbartist/id/7",
+    ).mock(return_value=httpx.Response(200, json={}))
+    respx_mock.route(
+        method="PUT",
+        port=manager.api_port,
+        host=manager.api_host,
+        path="/api/mbartist/id/8",
+    ).mock(return_value=httpx.Response(500))
+
+    # Act
+    for name in ["First", "Second", "Final"]:
+        artist.custom_name = name
+        await manager.queue_update_mbartist(7, artist)
+    await manager.queue_update_mbartist(8, artist)
+    queued_calls = respx_mock.calls.call_count
+
+    result = await manager.flush()
+
+    # Assert
+    assert queued_calls == 0, "Expected mutations to be queued"
+    assert update_route.call_count == 1, "Expected repeated updates to be merged"
+    assert json.loads(update_route.calls[0].request.content)["Name"] == "Final"
+    assert result[("mbartist", 7)] is None
+    assert isinstance(result[("mbartist", 8)], Exception)
+    assert len(manager.write_queue) == 0
+
+
+@pytest.mark.asyncio
+@respx.mock(assert_all_mocked=True)
+async def test_write_queue_flushes_on_size(respx_mock):
+    # Arrange
+    manager = TrackManager(write_queue=WriteBehindQueue(max_pending=2, max_delay=60))
+
+    route = respx_mock.route(
+        method="POST", port=manager.api_port, host=manager.api_host, path="/api/alias"
+    ).mock(return_value=httpx.Response(200, json={}))
+
+    # Act
+    await manager.queue_post_simple_artist_alias(1, "Artist A", 1)
+    await manager.queue_post_simple_artist_alias(2, "ArtistA", 1)
+    await manager.queue_post_simple_artist_alias(3, "Artist B", 1)
+    await asyncio.sleep(0.05)
+    await manager.queue_post_simple_artist_alias(4, "Artist C", 1)
+    calls_after_threshold = route.call_count
+    await manager.aclose()
+
+    # Assert
+    assert calls_after_threshold == 2, "Expected queue to flush once it is full"
+    assert [json.loads(c.request.content)["artistid"] for c in route.calls] == [
+        2,
+        3,
+        4,
+    ]
+
+
+@pytest.mark.asyncio
+@respx.mock(assert_all_mocked=True)
+async def test_write_queue_reports_failures_of_background_flushes(respx_mock):
+    # Arrange
+    manager = TrackManager(write_queue=WriteBehindQueue(max_pending=1, max_delay=60))
+    artist = create_mbartist("changed-mbid")
+
+    respx_mock.route(
+        method="PUT",
+        port=manager.api_port,
+        host=manager.api_host,
+        path="/api/mbartist/id/7",
+    ).mock(return_value=httpx.Response(500))
+
+    # Act
+    await manager.queue_update_mbartist(7, artist)
+    result = await manager.flush()
+
+    # Assert
+    assert isinstance(result[("mbartist", 7)], Exception)
+    assert await manager.flush() == {}, "Expected failures to be reported once"
+
+
+@pytest.mark.asyncio
+@respx.mock(assert_all_mocked=True)
+async def test_aclose_raises_failed_queued_mutations(respx_mock):
+    # Arrange
+    manager = TrackManager(write_queue=WriteBehindQueue(max_delay=60))
+    artist = create_mbartist("changed-mbid")
+
+    respx_mock.route(
+        method="PUT",
+        port=manager.api_port,
+        host=manager.api_host,
+        path="/api/mbartist/id/7",
+    ).mock(return_value=httpx.Response(500))
+
+    await manager.queue_update_mbartist(7, artist)
+    client = manager.client
+
+    # Act & Assert
+    with pytest.raises(WriteQueueError) as error:
+        await manager.aclose()
+
+    assert list(error.value.errors) == [("mbartist", 7)]
+    assert client.is_closed, "Expected the client to be closed despite the failure"
+
+
+@pytest.mark.asyncio
+async def test_write_queue_starts_one_background_flush_at_a_time():
+    # Arrange
+    queue = WriteBehindQueue(max_pending=10, max_delay=60)
+    sent_keys = []
+
+    def create_action(key):
+        async def action():
+            await asyncio.sleep(0)
+            sent_keys.append(key)
+
+        return action
+
+    # Act
+    for key in range(200):
+        queue.enqueue(key, create_action(key))
+    background_flushes = len(queue._background_flushes)
+    report = await queue.flush()
+
+    # Assert
+    assert background_flushes == 1
+    assert sorted(sent_keys) == list(range(200))
+    assert report == {}
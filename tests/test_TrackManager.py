@@ -1,5 +1,8 @@
+import asyncio
+import contextlib
 import os
 import sys
+import threading
 import pytest
 import httpx
 import respx
@@ -787,3 +790,261 @@ async def test_txxx_delete_artist_relations_frame():
     assert artist_relations_frame is None, (
         "The artist_relations_json frame should be deleted"
     )
+
+
+@pytest.mark.asyncio
+async def test_tag_io_uses_dedicated_thread_pools(mocker):
+    # Arrange
+    manager = TrackManager(read_workers=2, write_workers=1)
+    track = TrackDetails("/fake/path/file1.mp3", manager)
+    track.update_file = True
+    manager.tracks = [track]
+    thread_names = {}
+
+    def read_id3(file_path):
+        thread_names["read"] = threading.current_thread().name
+        return MagicMock()
+
+    def save_metadata():
+        thread_names["write"] = threading.current_thread().name
+
+    mocker.patch("mutagen.id3.ID3", side_effect=read_id3)
+    mocker.patch.object(track, "apply_custom_tag_values")
+    mocker.patch.object(track, "save_file_metadata", side_effect=save_metadata)
+
+    # Act
+    await track.get_id3_object(track.file_path)
+    await manager.save_files()
+    read_executor = manager.read_executor
+    await manager.aclose()
+
+    # Assert
+    assert thread_names["read"].startswith("id3-read")
+    assert thread_names["write"].startswith("id3-write")
+    assert read_executor._max_workers == 2
+    assert manager._read_executor is None, "Expected executors to be shut down"
+
+
+@pytest.mark.asyncio
+async def test_read_files_limits_concurrent_reads(mocker):
+    # Arrange
+    manager = TrackManager()
+    tracks = [TrackDetails(f"/fake/path/file{i}.mp3", manager) for i in range(50)]
+    in_flight = 0
+    max_in_flight = 0
+    read_tracks = []
+
+    async def read_file_metadata(self, read_artist_json, retain_id3):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0)
+        in_flight -= 1
+        read_tracks.append(self)
+
+    mocker.patch.object(TrackDetails, "read_file_metadata", read_file_metadata)
+
+    # Act
+    await manager.read_files(tracks, max_concurrency=4)
+
+    # Assert
+    assert max_in_flight == 4
+    assert sorted(read_tracks, key=tracks.index) == tracks
+
+
+@pytest.mark.asyncio
+async def test_read_file_metadata_without_retained_id3(mocker, mock_id3_tags):
+    # Arrange
+    track = TrackDetails("/fake/path/file1.mp3", TrackManager())
+    mock_id3_instance = mock_id3_tags(
+        {tag: ["Value"] for tag in TrackDetails.tag_mappings}
+    )
+    mocker.patch.object(track, "create_artist_objects", new_callable=AsyncMock)
+
+    # Act
+    await track.read_file_metadata(retain_id3=False)
+    retained_id3 = track.id3
+    track.title = "New Title"
+    track.save_file_metadata()
+
+    # Assert
+    assert track.title == "New Title"
+    assert retained_id3 is None
+    assert track.id3 is mock_id3_instance, "Expected tags to be loaded again on save"
+    mock_id3_instance.save.assert_called_once_with(track.file_path)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("ordered", [False, True])
+async def test_iter_load_files_yields_tracks_as_they_finish(mocker, ordered):
+    # Arrange
+    manager = TrackManager()
+    files = [f"/fake/path/file{i}.mp3" for i in range(5)]
+
+    async def read_file_metadata(self, read_artist_json, retain_id3):
+        # later files finish first
+        await asyncio.sleep(0.01 * (len(files) - files.index(self.file_path)))
+        self.title = self.file_path
+
+    mocker.patch.object(TrackDetails, "read_file_metadata", read_file_metadata)
+    mocker.patch("os.path.normpath", side_effect=lambda path: path)
+
+    # Act
+    titles = [
+        track.title
+        async for track in manager.iter_load_files(
+            files, max_concurrency=5, ordered=ordered
+        )
+    ]
+
+    # Assert
+    assert titles == (files if ordered else list(reversed(files)))
+    assert [track.file_path for track in manager.tracks] == files
+
+
+@pytest.mark.asyncio
+async def test_iter_load_files_removes_unread_tracks_when_stopped_early(mocker):
+    # Arrange
+    manager = TrackManager()
+    files = [f"/fake/path/file{i}.mp3" for i in range(10)]
+    read_files = []
+
+    async def read_file_metadata(self, read_artist_json, retain_id3):
+        await asyncio.sleep(0.01)
+        read_files.append(self.file_path)
+
+    mocker.patch.object(TrackDetails, "read_file_metadata", read_file_metadata)
+    mocker.patch("os.path.normpath", side_effect=lambda path: path)
+
+    # Act
+    async with contextlib.aclosing(
+        manager.iter_load_files(files, max_concurrency=2)
+    ) as tracks:
+        async for track in tracks:
+            first_track = track
+            break
+
+    # Assert
+    assert first_track in manager.tracks
+    assert len(read_files) < len(files)
+    assert [track.file_path for track in manager.tracks] == [
+        file for file in files if file in read_files
+    ]
+
+
+@pytest.mark.asyncio
+async def test_iter_load_files_ordered_limits_tracks_ahead(mocker):
+    # Arrange
+    manager = TrackManager()
+    files = [f"/fake/path/file{i}.mp3" for i in range(50)]
+    first_file_released = asyncio.Event()
+    started_files = []
+
+    async def read_file_metadata(self, read_artist_json, retain_id3):
+        started_files.append(self.file_path)
+        if self.file_path == files[0]:
+            await first_file_released.wait()
+
+    mocker.patch.object(TrackDetails, "read_file_metadata", read_file_metadata)
+    mocker.patch("os.path.normpath", side_effect=lambda path: path)
+
+    async def release_first_file():
+        await asyncio.sleep(0.05)
+        started_while_blocked.extend(started_files)
+        first_file_released.set()
+
+    started_while_blocked = []
+    release = asyncio.ensure_future(release_first_file())
+
+    # Act
+    loaded_files = [
+        track.file_path
+        async for track in manager.iter_load_files(
+            files, max_concurrency=3, ordered=True
+        )
+    ]
+    await release
+
+    # Assert
+    assert loaded_files == files
+    assert started_while_blocked == files[:3], (
+        "Expected no more than max_concurrency files to be read ahead"
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("recursive", [True, False])
+async def test_load_directory(mocker, tmp_path, recursive):
+    # Arrange
+    manager = TrackManager()
+    (tmp_path / "album" / "disc2").mkdir(parents=True)
+    expected_files = [tmp_path / "single.mp3"]
+    if recursive:
+        expected_files += [
+            tmp_path / "album" / "track1.mp3",
+            tmp_path / "album" / "disc2" / "track2.mp3",
+        ]
+
+    for file in [
+        tmp_path / "single.mp3",
+        tmp_path / "album" / "track1.mp3",
+        tmp_path / "album" / "disc2" / "track2.mp3",
+        tmp_path / "album" / "cover.jpg",
+    ]:
+        file.touch()
+
+    read_file_metadata = mocker.patch.object(
+        TrackDetails, "read_file_metadata", new_callable=AsyncMock
+    )
+
+    # Act
+    new_tracks = await manager.load_directory(str(tmp_path), recursive=recursive)
+    repeated_tracks = await manager.load_directory(str(tmp_path), recursive=recursive)
+
+    # Assert
+    assert sorted(track.file_path for track in new_tracks) == sorted(
+        os.path.normpath(file) for file in expected_files
+    )
+    assert repeated_tracks == [], "Expected loaded files to be skipped"
+    assert len(manager.tracks) == len(expected_files)
+    assert read_file_metadata.call_count == len(expected_files)
+    await manager.aclose()
+
+
+@pytest.mark.asyncio
+async def test_failed_read_keeps_unread_files_from_being_saved(mocker, tmp_path):
+    # Arrange
+    files = []
+    for i in range(20):
+        file_path = str(tmp_path / f"track{i:02}.mp3")
+        if i == 0:
+            with open(file_path, "wb") as file:
+                file.write(b"ID3\x04\x00\x00\xff\xff\xff\xff")
+        else:
+            file_id3 = id3.ID3()
+            file_id3.add(id3.TIT2(encoding=3, text=f"Title {i}"))
+            file_id3.save(file_path)
+        files.append(file_path)
+
+    mocker.patch.object(TrackDetails, "create_artist_objects", new_callable=AsyncMock)
+    manager = TrackManager()
+
+    # Act
+    with pytest.raises(Exception):
+        await manager.load_files(files, max_concurrency=2)
+    await manager.save_files()
+
+    # Assert
+    assert all(track.tags_read for track in manager.tracks)
+    for i, file_path in enumerate(files[1:], start=1):
+        assert id3.ID3(file_path)["TIT2"].text == [f"Title {i}"]
+    await manager.aclose()
+
+
+def test_save_file_metadata_refuses_unread_track():
+    # Arrange
+    track = TrackDetails("/fake/path/file1.mp3", TrackManager())
+
+    # Act & Assert
+    with pytest.raises(ValueError, match="were not read"):
+        track.save_file_metadata()
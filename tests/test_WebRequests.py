@@ -1,6 +1,13 @@
+import asyncio
+import gzip
+import json
+import logging
+import sys
+import threading
 import pytest
 import httpx
 import respx
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from artist_resolver.trackmanager import (
     TrackManager,
     MbArtistDetails,
@@ -586,3 +593,457 @@ async def test_post_mbartist_conflict(respx_mock):
     with pytest.raises(Exception) as excinfo:
         await manager.post_mbartist(artist)
     assert "Artist with MBID" in str(excinfo.value)
+
+
+@pytest.mark.asyncio
+@respx.mock(assert_all_mocked=True)
+async def test_requests_share_one_client(respx_mock):
+    # Arrange
+    manager = TrackManager()
+
+    respx_mock.route(
+        method="GET",
+        port=manager.api_port,
+        host=manager.api_host,
+        path__regex=r"/api/mbartist/mbid/.*",
+    ).mock(return_value=httpx.Response(404))
+
+    # Act
+    await manager.get_mbartist("mock-mbid1")
+    client = manager.client
+    await manager.get_mbartist("mock-mbid2")
+
+    # Assert
+    assert manager.client is client, "Expected all requests to reuse the same client"
+    assert respx_mock.calls.call_count == 2
+    await manager.aclose()
+
+
+@pytest.mark.asyncio
+@respx.mock(assert_all_mocked=True)
+async def test_context_manager_closes_client(respx_mock):
+    # Arrange
+    respx_mock.route(
+        method="GET",
+        port=TrackManager.API_PORT,
+        host=TrackManager.API_DOMAIN,
+        path="/health",
+    ).mock(return_value=httpx.Response(200))
+
+    # Act
+    async with TrackManager() as manager:
+        healthy = await manager.get_server_health()
+        client = manager.client
+
+    # Assert
+    assert healthy is True
+    assert client.is_closed, "Expected client to be closed when leaving the context"
+    assert manager._client is None
+
+
+@pytest.mark.asyncio
+@respx.mock(assert_all_mocked=True)
+async def test_identical_get_requests_are_coalesced(respx_mock):
+    # Arrange
+    manager = TrackManager()
+    mbid = "mock-mbid"
+
+    async def mbartist_response(request):
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"mbid": mbid, "name": "MbArtist"})
+
+    respx_mock.route(
+        method="GET",
+        port=manager.api_port,
+        host=manager.api_host,
+        path=f"/api/mbartist/mbid/{mbid}",
+    ).mock(side_effect=mbartist_response)
+
+    respx_mock.route(
+        method="GET",
+        port=manager.api_port,
+        host=manager.api_host,
+        path="/api/alias",
+    ).mock(return_value=httpx.Response(200, json=[{"id": 1}]))
+
+    # Act
+    results = await asyncio.gather(
+        *(manager.get_mbartist(mbid) for _ in range(5)),
+        manager.get_simple_artist_alias("Artist1", 1),
+        manager.get_simple_artist_alias("Artist2", 1),
+    )
+
+    # Assert
+    assert all(result["mbid"] == mbid for result in results[:5])
+    assert respx_mock.calls.call_count == 3, (
+        "Expected identical requests to share a single call"
+    )
+    assert manager._in_flight_requests == {}
+
+    # requests that are no longer in flight are sent again
+    await manager.get_mbartist(mbid)
+    assert respx_mock.calls.call_count == 4
+
+
+@pytest.mark.asyncio
+@respx.mock(assert_all_mocked=True)
+async def test_coalesced_request_failure_is_raised_for_all_callers(respx_mock):
+    # Arrange
+    manager = TrackManager()
+
+    async def mbartist_response(request):
+        await asyncio.sleep(0.01)
+        return httpx.Response(500)
+
+    respx_mock.route(
+        method="GET",
+        port=manager.api_port,
+        host=manager.api_host,
+        path__regex=r"/api/mbartist/mbid/.*",
+    ).mock(side_effect=mbartist_response)
+
+    # Act
+    results = await asyncio.gather(
+        *(manager.get_mbartist("mock-mbid") for _ in range(3)),
+        return_exceptions=True,
+    )
+
+    # Assert
+    assert respx_mock.calls.call_count == 1
+    assert all(isinstance(result, Exception) for result in results)
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(sys.platform == "win32", reason="Requires unix domain sockets")
+async def test_requests_over_unix_domain_socket(tmp_path):
+    # Arrange
+    socket_path = str(tmp_path / "api.sock")
+    request_lines = []
+
+    async def handle_connection(reader, writer):
+        request_lines.append((await reader.readuntil(b"\r\n")).decode().strip())
+        await reader.readuntil(b"\r\n\r\n")
+
+        body = json.dumps({"mbid": "mock-mbid", "name": "Name"}).encode()
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: application/json\r\n"
+            b"Connection: close\r\n"
+            + f"Content-Length: {len(body)}\r\n\r\n".encode()
+            + body
+        )
+        await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_unix_server(handle_connection, path=socket_path)
+
+    # Act
+    async with server:
+        async with TrackManager(uds=socket_path) as manager:
+            result = await manager.get_mbartist("mock-mbid")
+
+    # Assert
+    assert result == {"mbid": "mock-mbid", "name": "Name"}
+    assert request_lines == ["GET /api/mbartist/mbid/mock-mbid HTTP/1.1"]
+
+
+def test_http2_falls_back_without_h2(mocker, caplog):
+    # Arrange
+    mocker.patch("artist_resolver.trackmanager.h2_available", return_value=False)
+
+    # Act
+    with caplog.at_level(logging.WARNING, logger="artist_resolver.trackmanager"):
+        manager = TrackManager(http2=True)
+
+    # Assert
+    assert manager.http2 is False
+    assert manager.client is not None
+    assert "h2 package is not installed" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_http2_requests_are_multiplexed_over_one_connection():
+    # Arrange
+    pytest.importorskip("h2")
+    import h2.config
+    import h2.connection
+    import h2.events
+
+    connections = 0
+    in_flight = 0
+    max_in_flight = 0
+
+    async def respond(conn, writer, stream_id, path):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.05)
+        in_flight -= 1
+
+        body = json.dumps({"mbid": path.rsplit("/", 1)[-1]}).encode()
+        conn.send_headers(
+            stream_id,
+            [
+                (":status", "200"),
+                ("content-type", "application/json"),
+                ("content-length", str(len(body))),
+            ],
+        )
+        conn.send_data(stream_id, body, end_stream=True)
+        writer.write(conn.data_to_send())
+        await writer.drain()
+
+    async def handle_connection(reader, writer):
+        nonlocal connections
+        connections += 1
+        conn = h2.connection.H2Connection(
+            config=h2.config.H2Configuration(client_side=False)
+        )
+        conn.initiate_connection()
+        writer.write(conn.data_to_send())
+        paths = {}
+        responses = []
+
+        while data := await reader.read(65535):
+            for event in conn.receive_data(data):
+                if isinstance(event, h2.events.RequestReceived):
+                    paths[event.stream_id] = dict(event.headers)[b":path"].decode()
+                elif isinstance(event, h2.events.StreamEnded):
+                    responses.append(
+                        asyncio.create_task(
+                            respond(
+                                conn, writer, event.stream_id, paths[event.stream_id]
+                            )
+                        )
+                    )
+            writer.write(conn.data_to_send())
+            await writer.drain()
+
+        await asyncio.gather(*responses)
+        writer.close()
+
+    server = await asyncio.start_server(handle_connection, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+
+    # Act
+    async with server:
+        async with TrackManager(host="127.0.0.1", port=port, http2=True) as manager:
+            results = await asyncio.gather(
+                *(manager.get_mbartist(f"mbid-{i}") for i in range(10))
+            )
+            http2 = manager.http2
+
+    # Assert
+    assert results == [{"mbid": f"mbid-{i}"} for i in range(10)]
+    assert http2 is True
+    assert connections == 1
+    assert max_in_flight > 1, "Expected requests to share one connection in parallel"
+
+
+@pytest.mark.asyncio
+@respx.mock(assert_all_mocked=True)
+async def test_http2_falls_back_to_http1_on_protocol_error(respx_mock):
+    # Arrange
+    pytest.importorskip("h2")
+    manager = TrackManager(http2=True)
+
+    respx_mock.route(
+        method="GET",
+        port=manager.api_port,
+        host=manager.api_host,
+        path="/api/mbartist/mbid/mock-mbid",
+    ).mock(
+        side_effect=[
+            httpx.RemoteProtocolError("Server does not speak http2"),
+            httpx.Response(200, json={"name": "Name"}),
+        ]
+    )
+
+    # Act
+    first_client = manager.client
+    result = await manager.get_mbartist("mock-mbid")
+
+    # Assert
+    assert result == {"name": "Name"}
+    assert manager.http2 is False
+    assert manager.client is not first_client
+    await manager.aclose()
+    assert first_client.is_closed
+
+
+class MbArtistHandler(BaseHTTPRequestHandler):
+    """
+    Answers every request with a mb artist named after the last segment of the path
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = json.dumps({"mbid": self.path.rsplit("/", 1)[-1]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http1_server() -> ThreadingHTTPServer:
+    """
+    Starts a local http/1.1 server on a background thread
+    """
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MbArtistHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_client_is_recreated_for_another_event_loop():
+    # Arrange
+    server = start_http1_server()
+    manager = TrackManager(host="127.0.0.1", port=server.server_address[1])
+
+    # Act
+    try:
+        first_result = asyncio.run(manager.get_mbartist("mbid-1"))
+        second_result = asyncio.run(manager.get_mbartist("mbid-2"))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # Assert
+    assert first_result == {"mbid": "mbid-1"}
+    assert second_result == {"mbid": "mbid-2"}
+
+
+@pytest.mark.asyncio
+async def test_parallel_http2_requests_fall_back_against_http1_server():
+    # Arrange
+    pytest.importorskip("h2")
+
+    server = start_http1_server()
+
+    # Act
+    try:
+        async with TrackManager(
+            host="127.0.0.1", port=server.server_address[1], http2=True
+        ) as manager:
+            results = await asyncio.gather(
+                *(manager.get_mbartist(f"mbid-{i}") for i in range(5))
+            )
+            http2 = manager.http2
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # Assert
+    assert results == [{"mbid": f"mbid-{i}"} for i in range(5)]
+    assert http2 is False
+
+
+@pytest.mark.asyncio
+@respx.mock(assert_all_mocked=True)
+async def test_streamed_list_falls_back_to_http1_on_protocol_error(respx_mock):
+    # Arrange
+    pytest.importorskip("h2")
+    manager = TrackManager(http2=True)
+    url = f"{manager.api_base_url}/{manager.SIMPLE_ARTIST_FRANCHISE_API_ENDPOINT}"
+
+    respx_mock.route(
+        method="GET",
+        port=manager.api_port,
+        host=manager.api_host,
+        path="/api/franchise",
+    ).mock(
+        side_effect=[
+            httpx.RemoteProtocolError("Server does not speak http2"),
+            httpx.Response(200, json=[{"id": 1}, {"id": 2}]),
+        ]
+    )
+
+    # Act
+    result = [item async for item in manager.iter_json_list(url, "franchises")]
+
+    # Assert
+    assert result == [{"id": 1}, {"id": 2}]
+    assert manager.http2 is False
+    await manager.aclose()
+
+
+@pytest.mark.asyncio
+@respx.mock(assert_all_mocked=True)
+async def test_compressed_responses_are_decoded_and_measured(respx_mock):
+    # Arrange
+    manager = TrackManager()
+    franchises = [{"id": i, "name": f"Franchise {i}"} for i in range(500)]
+    body = json.dumps(franchises).encode()
+
+    respx_mock.route(
+        method="GET",
+        port=manager.api_port,
+        host=manager.api_host,
+        path="/api/franchise",
+    ).mock(
+        return_value=httpx.Response(
+            200,
+            content=gzip.compress(body),
+            headers={"Content-Encoding": "gzip", "Content-Type": "application/json"},
+        )
+    )
+
+    # Act
+    result = await manager.list_simple_artist_franchise()
+
+    # Assert
+    assert result == franchises
+    assert "gzip" in respx_mock.calls[0].request.headers["Accept-Encoding"]
+    metrics = manager.client_metrics
+    assert metrics["responses"] == 1
+    assert metrics["bytes_decoded"] == len(body)
+    assert metrics["bytes_transferred"] == len(gzip.compress(body))
+    assert metrics["bytes_saved"] > 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "encoding, module_name",
+    [("br", "brotli"), ("zstd", "zstandard")],
+)
+@respx.mock(assert_all_mocked=True)
+async def test_brotli_and_zstd_responses_are_decoded(respx_mock, encoding, module_name):
+    # Arrange
+    module = pytest.importorskip(module_name)
+    manager = TrackManager()
+    franchises = [{"id": i, "name": f"Franchise {i}"} for i in range(500)]
+    body = json.dumps(franchises).encode()
+    compressed = (
+        module.compress(body)
+        if encoding == "br"
+        else module.ZstdCompressor().compress(body)
+    )
+
+    respx_mock.route(
+        method="GET",
+        port=manager.api_port,
+        host=manager.api_host,
+        path="/api/franchise",
+    ).mock(
+        return_value=httpx.Response(
+            200,
+            content=compressed,
+            headers={"Content-Encoding": encoding, "Content-Type": "application/json"},
+        )
+    )
+
+    # Act
+    result = await manager.list_simple_artist_franchise()
+
+    # Assert
+    assert result == franchises
+    assert encoding in respx_mock.calls[0].request.headers["Accept-Encoding"]
+    metrics = manager.client_metrics
+    assert metrics["bytes_decoded"] == len(body)
+    assert metrics["bytes_transferred"] == len(compressed)
+    await manager.aclose()
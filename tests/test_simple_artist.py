@@ -1,9 +1,11 @@
+import asyncio
 import hashlib
 import pytest
 import httpx
 import respx
 import json
 from artist_resolver.trackmanager import (
+    JsonArrayDecoder,
     SimpleArtistDetails,
     TrackManager,
     TrackDetails,
@@ -209,6 +211,36 @@ async def test_parse_franchise():
     assert result == product_list[0]
 
 
+@pytest.mark.asyncio
+async def test_resolve_franchise_from_index():
+    # Arrange
+    product_list = [
+        {"id": 1, "name": "_"},
+        {"id": 2, "name": "Franchise1"},
+        {"id": 3, "name": "Franchise1"},
+        {"id": 4, "name": "FranchiseWithSpaces"},
+    ]
+
+    # Act
+    franchise_index = SimpleArtistDetails.build_franchise_index(product_list)
+
+    # Assert
+    assert len(franchise_index) == 3
+    assert franchise_index["Franchise1"] == product_list[1], (
+        "Expected the first entry to be used for duplicate franchise names"
+    )
+
+    result = SimpleArtistDetails.resolve_simple_artist_franchise(
+        "Franchise With Spaces", None, franchise_index
+    )
+    assert result == product_list[3]
+
+    result = SimpleArtistDetails.resolve_simple_artist_franchise(
+        None, "NonExistentFranchise", franchise_index
+    )
+    assert result == product_list[0]
+
+
 def test_generate_instance_hash():
     # Arrange
     artist = SimpleArtistDetails(
@@ -1054,3 +1086,434 @@ async def test_application_handles_file_with_no_tags(respx_mock):
     assert track.album_artist is None, "Expected no album artist in track"
     assert track.title is None, "Expected no title in track"
     assert track.album is None, "Expected no album in track"
+
+
+@pytest.mark.asyncio
+@respx.mock(assert_all_mocked=True)
+async def test_send_changes_to_db_concurrent_keeps_alias_order(respx_mock):
+    # Arrange
+    manager = TrackManager()
+    artist_ids = {}
+
+    for i in range(5):
+        artist = SimpleArtistDetails(
+            name=f"NewSimpleArtist{i}",
+            type="Person",
+            disambiguation="",
+            sort_name=f"NewSimpleArtist{i}",
+            id=None,
+            aliases=[],
+            type_id="b6e035f4-3ce9-331c-97df-83397230b0df",
+            joinphrase="",
+            product="_",
+            product_id=1,
+        )
+        manager.artist_data[artist.mbid] = artist
+
+    # artist lookups by name never find anything
+    respx_mock.route(
+        method="GET", port=manager.api_port, host=manager.api_host, path="/api/artist"
+    ).mock(return_value=httpx.Response(200, text="[]"))
+
+    respx_mock.route(
+        method="GET", port=manager.api_port, host=manager.api_host, path="/api/alias"
+    ).mock(return_value=httpx.Response(200, text="[]"))
+
+    async def post_artist_response(request):
+        await asyncio.sleep(0.01)
+        name = json.loads(request.content.decode())["Name"]
+        if name == "NewSimpleArtist2":
+            return httpx.Response(500)
+
+        artist_ids[name] = 100 + len(artist_ids)
+        return httpx.Response(200, json={"id": artist_ids[name], "name": name})
+
+    respx_mock.route(
+        method="POST", port=manager.api_port, host=manager.api_host, path="/api/artist"
+    ).mock(side_effect=post_artist_response)
+
+    respx_mock.route(
+        method="POST", port=manager.api_port, host=manager.api_host, path="/api/alias"
+    ).mock(return_value=httpx.Response(200, json={}))
+
+    # Act
+    result = await manager.send_changes_to_db(max_concurrency=5)
+
+    # Assert
+    failed_artist = next(
+        a for a in manager.artist_data.values() if a.name == "NewSimpleArtist2"
+    )
+    assert isinstance(result.pop(failed_artist.mbid), Exception)
+    assert all(error is None for error in result.values())
+
+    alias_posts = [
+        json.loads(c.request.content.decode())
+        for c in respx_mock.calls
+        if c.request.method == "POST" and c.request.url.path == "/api/alias"
+    ]
+    assert len(alias_posts) == 4, "Expected no alias to be posted for failed artist"
+    for alias in alias_posts:
+        assert alias["artistid"] == artist_ids[alias["Name"]], (
+            "Alias was not posted with the id of its created artist"
+        )
+
+
+@pytest.mark.asyncio
+@respx.mock(assert_all_mocked=True)
+async def test_franchise_list_is_loaded_once_for_concurrent_tracks(respx_mock):
+    # Arrange
+    manager = TrackManager()
+
+    async def franchise_response(request):
+        await asyncio.sleep(0.01)
+        return httpx.Response(
+            200,
+            json=[
+                {"id": 1, "name": "_", "aliases": []},
+                {"id": 2, "name": "TestFranchise1", "aliases": []},
+            ],
+        )
+
+    respx_mock.route(
+        method="GET",
+        port=manager.api_port,
+        host=manager.api_host,
+        path="/api/franchise",
+    ).mock(side_effect=franchise_response)
+
+    tracks = []
+    for i in range(10):
+        track = TrackDetails(f"/fake/path/file{i}.mp3", manager)
+        track.artist = [f"Artist{i}"]
+        track.product = "TestFranchise1"
+        tracks.append(track)
+
+    # Act
+    await asyncio.gather(
+        *(manager.create_artist_details_from_simple_artist_track(t) for t in tracks)
+    )
+
+    # Assert
+    assert respx_mock.calls.call_count == 1, (
+        "Expected the franchise list to be downloaded exactly once"
+    )
+    assert all(artist.product_id == 2 for artist in manager.artist_data.values()), (
+        "Expected all artists to be resolved to the loaded franchise"
+    )
+
+    # invalidating the list downloads it again on next use
+    manager.invalidate_simple_artist_franchises()
+    await manager.load_simple_artist_franchises()
+    assert respx_mock.calls.call_count == 2
+
+
+@pytest.mark.asyncio
+@respx.mock(assert_all_mocked=True)
+async def test_franchise_list_prefetch(respx_mock):
+    # Arrange
+    respx_mock.route(
+        method="GET",
+        port=TrackManager.API_PORT,
+        host=TrackManager.API_DOMAIN,
+        path="/api/franchise",
+    ).mock(return_value=httpx.Response(200, json=[{"id": 1, "name": "_"}]))
+
+    # Act
+    async with TrackManager(prefetch_franchises=True) as manager:
+        # Assert
+        assert respx_mock.calls.call_count == 1
+        assert manager.db_products == [{"id": 1, "name": "_"}]
+
+
+@pytest.mark.asyncio
+@respx.mock(assert_all_mocked=True)
+async def test_update_artists_info_from_db_prefetch_aliases(respx_mock):
+    # Arrange
+    manager = TrackManager()
+
+    for franchise_id in [1, 2, 3]:
+        for i in range(3):
+            artist = SimpleArtistDetails(
+                name=f"Simple Artist{i}",
+                type="Person",
+                disambiguation="",
+                sort_name=f"Simple Artist{i}",
+                id=None,
+                aliases=[],
+                type_id="b6e035f4-3ce9-331c-97df-83397230b0df",
+                joinphrase="",
+                product=f"Franchise{franchise_id}",
+                product_id=franchise_id,
+            )
+            manager.artist_data[artist.mbid] = artist
+
+    franchise_aliases = {
+        "1": [
+            {
+                "id": 10,
+                "name": "SimpleArtist0",
+                "artistId": 100,
+                "artist": "Custom Artist0",
+                "franchiseId": 1,
+            }
+        ],
+        "2": [],
+    }
+
+    def alias_response(request):
+        if "name" in request.url.params:
+            # individual lookups for artists of the franchise that failed to load
+            return httpx.Response(200, text="[]")
+
+        franchise_id = request.url.params["franchiseId"]
+        if franchise_id not in franchise_aliases:
+            return httpx.Response(500)
+
+        return httpx.Response(200, json=franchise_aliases[franchise_id])
+
+    respx_mock.route(
+        method="GET", port=manager.api_port, host=manager.api_host, path="/api/alias"
+    ).mock(side_effect=alias_response)
+
+    # Act
+    result = await manager.update_artists_info_from_db(prefetch_aliases=True)
+
+    # Assert
+    franchise_calls = [
+        c for c in respx_mock.calls if "name" not in c.request.url.params
+    ]
+    assert len(franchise_calls) == 3, "Expected one alias request per franchise"
+    assert respx_mock.calls.call_count == 6, (
+        "Expected individual requests only for artists of the failed franchise"
+    )
+    assert len(result) == 9
+    assert all(artist.updated_from_server for artist in manager.artist_data.values())
+
+    customized = [a for a in manager.artist_data.values() if a.has_server_data]
+    assert len(customized) == 1
+    assert customized[0].product_id == 1
+    assert customized[0].custom_name == "Custom Artist0"
+    assert customized[0].id == 100
+
+
+@pytest.mark.asyncio
+@respx.mock(assert_all_mocked=True)
+async def test_send_simple_artist_changes_with_local_index(respx_mock):
+    # Arrange
+    manager = TrackManager()
+
+    def create_artist(name, id):
+        artist = SimpleArtistDetails(
+            name=name,
+            type="Person",
+            disambiguation="",
+            sort_name=name,
+            id=id,
+            aliases=[],
+            type_id="b6e035f4-3ce9-331c-97df-83397230b0df",
+            joinphrase="",
+            product="_",
+            product_id=1,
+        )
+        return artist
+
+    existing_artist = create_artist("ExistingArtist", None)
+    new_artist = create_artist("NewArtist", None)
+    renamed_artist = create_artist("RenamedArtist", 3)
+
+    respx_mock.route(
+        method="GET", port=manager.api_port, host=manager.api_host, path="/api/artist"
+    ).mock(
+        return_value=httpx.Response(
+            200,
+            json=[
+                {"id": 1, "name": "ExistingArtist"},
+                {"id": 3, "name": "OldArtistName"},
+            ],
+        )
+    )
+
+    respx_mock.route(
+        method="POST", port=manager.api_port, host=manager.api_host, path="/api/artist"
+    ).mock(return_value=httpx.Response(200, json={"id": 2, "name": "NewArtist"}))
+
+    respx_mock.route(
+        method="PUT",
+        port=manager.api_port,
+        host=manager.api_host,
+        path="/api/artist/id/3",
+    ).mock(return_value=httpx.Response(200, json={"id": 3, "name": "RenamedArtist"}))
+
+    # Act
+    await manager.load_simple_artist_index()
+    for artist in [existing_artist, new_artist, renamed_artist]:
+        await manager.send_simple_artist_changes_to_db(artist)
+
+    # the local lookup is updated with the changes sent to the db
+    await manager.send_simple_artist_changes_to_db(create_artist("NewArtist", None))
+    await manager.send_simple_artist_changes_to_db(create_artist("RenamedArtist", 3))
+
+    # Assert
+    assert [c.request.method for c in respx_mock.calls] == ["GET", "POST", "PUT"], (
+        "Expected only one request to load the artists and one per change"
+    )
+    assert existing_artist.id == 1
+    assert new_artist.id == 2
+    assert renamed_artist.id == 3
+    assert "OldArtistName" not in manager.simple_artists_by_name
+
+    manager.clear_simple_artist_index()
+    assert manager.simple_artists_by_id is None
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 1000])
+def test_json_array_decoder_decodes_chunks(chunk_size):
+    # Arrange
+    items = [{"id": 1, "name": "A [b], c"}, 12345, "text", [1, 2], None]
+    text = json.dumps(items, indent=1)
+    decoder = JsonArrayDecoder()
+
+    # Act
+    result = []
+    for start in range(0, len(text), chunk_size):
+        result.extend(decoder.feed(text[start : start + chunk_size]))
+    result.extend(decoder.feed("", final=True))
+
+    # Assert
+    assert result == items
+
+
+@pytest.mark.parametrize("text", ["", "null", "[]", " [ ] "])
+def test_json_array_decoder_empty_bodies(text):
+    # Act
+    result = JsonArrayDecoder().feed(text, final=True)
+
+    # Assert
+    assert result == []
+
+
+@pytest.mark.parametrize(
+    "text",
+    ['{"id": 1}', '[{"id": 1}', '[{"id": 1} {"id": 2}]', "[1,]", '[{"id": 1},]'],
+)
+def test_json_array_decoder_rejects_invalid_bodies(text):
+    # Act & Assert
+    with pytest.raises(ValueError):
+        JsonArrayDecoder().feed(text, final=True)
+
+
+@pytest.mark.asyncio
+@respx.mock(assert_all_mocked=True)
+async def test_stream_franchise_list(respx_mock):
+    # Arrange
+    manager = TrackManager(stream_lists=True)
+    product_list = [{"id": i, "name": f"Franchise{i}"} for i in range(1000)]
+    product_list.append({"id": 1000, "name": "Franchise1"})
+    body = json.dumps(product_list).encode()
+
+    async def stream_body():
+        for start in range(0, len(body), 512):
+            yield body[start : start + 512]
+
+    respx_mock.route(
+        method="GET",
+        port=manager.api_port,
+        host=manager.api_host,
+        path="/api/franchise",
+    ).mock(return_value=httpx.Response(200, content=stream_body()))
+
+    # Act
+    result = await manager.load_simple_artist_franchises()
+
+    # Assert
+    assert result == product_list
+    assert len(manager.db_product_index) == 1000
+    assert manager.db_product_index["Franchise1"]["id"] == 1
+    assert manager.client_metrics["bytes_decoded"] == len(body)
+
+
+@pytest.mark.asyncio
+@respx.mock(assert_all_mocked=True)
+async def test_failed_franchise_stream_keeps_loaded_franchises(respx_mock):
+    # Arrange
+    manager = TrackManager(stream_lists=True)
+    product_list = [{"id": 1, "name": "Franchise1"}, {"id": 2, "name": "Franchise2"}]
+    manager.db_products = product_list
+    manager.db_product_index = SimpleArtistDetails.build_franchise_index(product_list)
+    body = json.dumps([{"id": i, "name": f"New{i}"} for i in range(100)]).encode()
+
+    respx_mock.route(
+        method="GET",
+        port=manager.api_port,
+        host=manager.api_host,
+        path="/api/franchise",
+    ).mock(return_value=httpx.Response(200, content=body[:-20]))
+
+    # Act
+    with pytest.raises(ValueError):
+        await manager.load_simple_artist_franchises(refresh=True)
+
+    # Assert
+    assert manager.db_products is product_list
+    assert list(manager.db_product_index) == ["Franchise1", "Franchise2"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("bulk", [False, True])
+@respx.mock(assert_all_mocked=True)
+async def test_send_changes_to_db_concurrent_shared_name_across_franchises(
+    respx_mock, bulk
+):
+    # Arrange
+    manager = TrackManager()
+    db_artists = []
+
+    for product_id in [1, 2]:
+        artist = SimpleArtistDetails(
+            name="Same",
+            type="Person",
+            disambiguation="",
+            sort_name="Same",
+            id=None,
+            aliases=[],
+            type_id="b6e035f4-3ce9-331c-97df-83397230b0df",
+            joinphrase="",
+            product="_",
+            product_id=product_id,
+        )
+        manager.artist_data[artist.mbid] = artist
+
+    def get_artist_response(request):
+        name = request.url.params.get("name")
+        matches = [a for a in db_artists if name is None or a["name"] == name]
+        return httpx.Response(200, json=matches)
+
+    async def post_artist_response(request):
+        await asyncio.sleep(0.01)
+        name = json.loads(request.content.decode())["Name"]
+        if any(a["name"] == name for a in db_artists):
+            return httpx.Response(409)
+
+        db_artists.append({"id": len(db_artists) + 1, "name": name})
+        return httpx.Response(200, json=db_artists[-1])
+
+    respx_mock.route(
+        method="GET", port=manager.api_port, host=manager.api_host, path="/api/artist"
+    ).mock(side_effect=get_artist_response)
+    respx_mock.route(
+        method="POST", port=manager.api_port, host=manager.api_host, path="/api/artist"
+    ).mock(side_effect=post_artist_response)
+    respx_mock.route(
+        method="GET", port=manager.api_port, host=manager.api_host, path="/api/alias"
+    ).mock(return_value=httpx.Response(200, text="[]"))
+    respx_mock.route(
+        method="POST", port=manager.api_port, host=manager.api_host, path="/api/alias"
+    ).mock(return_value=httpx.Response(200, json={}))
+
+    # Act
+    result = await manager.send_changes_to_db(max_concurrency=2, bulk=bulk)
+
+    # Assert
+    assert list(result.values()) == [None, None]
+    assert db_artists == [{"id": 1, "name": "Same"}]
+    assert all(artist.id == 1 for artist in manager.artist_data.values())